@@ -1,20 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from typing import List
-from schemas.AgentSchemas import AgentCreate, AgentUpdate, AgentResponse
-from schemas.ChatSchemas import ChatCreate, ChatResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, UploadFile, File, Form, Query
+from sqlalchemy.ext.asyncio import AsyncSession as Session
+from typing import List, Optional
+from schemas.AgentSchemas import AgentCreate, AgentUpdate, AgentResponse, AgentDocumentResponse
+from schemas.ChatSchemas import ChatCreate, ChatResponse, ChatHistoryResponse
+from schemas.IngestionSchemas import IngestionJobResponse
 from Services.db_config import get_db
 from Services.auth import get_current_user
-from Services.agent_management import create_agent, get_agents_by_session, get_agent_by_id, update_agent, delete_agent, prepare_rag_chain, chains_cache
+from Services.agent_management import create_agent, get_agents_by_session, get_agent_by_id, update_agent, delete_agent, restore_retriever, chains_cache
 from Services.session_management import get_session_by_id
+from Services.inference import inference_scheduler
+from Services.ingestion import create_job, get_job, get_active_job, cancel_job
+from Services.DocManagement import save_upload
+from Services.document_set import list_documents, add_document, remove_document, INDEXED_STATES
+from Services.streaming import TokenQueueHandler, sse_event
+from Services.response_cache import response_cache
+from Services.conversation_memory import conversation_store
+from Services.rag_engine import rag_engine
+from Services.chat_log import chat_log
+from Services.chat_history import list_chat_history, HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE
+from Services.pagination import InvalidCursor, PAGE_SIZE, MAX_PAGE_SIZE
+from Services.vector_store import current_index_hash
 from models.UserModels import User
 from models.ChatModels import Chat
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from datetime import datetime
+from functools import partial
+import asyncio
 import os
 import logging
-import json
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,47 +40,66 @@ templates = Jinja2Templates(directory="templates")
 async def create_new_agent(session_id: str, agent_data: AgentCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     if current_user.id != agent_data.user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to create an agent for this user")
-    new_agent = create_agent(agent_data, db)
+    new_agent = await create_agent(agent_data, db)
     return new_agent
 
+# Next-page cursor, if any, in the X-Next-Cursor header (as /sessions/user_sessions)
 @agent_routes.get("/sessions/{session_id}/agents", response_model=List[AgentResponse])
-async def get_agents_for_session(session_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    agents = get_agents_by_session(session_id, db)
+async def get_agents_for_session(
+    session_id: str,
+    response: Response,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        agents, next_cursor = await get_agents_by_session(session_id, db, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return agents
 
 @agent_routes.get("/sessions/{session_id}/agents/{agent_id}", response_class=HTMLResponse, name="agent_details_page")
 async def get_agent_details(request: Request, session_id: str, agent_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    agent = get_agent_by_id(agent_id, db)
+    agent = await get_agent_by_id(agent_id, db)
     if not agent:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
-    session = get_session_by_id(session_id, db)
+    session = await get_session_by_id(session_id, db)
     if not session:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
     return templates.TemplateResponse("agent.html", {"request": request, "session": session, "agent": agent, "current_user": current_user})
 
 @agent_routes.put("/sessions/{session_id}/agents/{agent_id}", response_model=AgentResponse)
 async def update_existing_agent(session_id: str, agent_id: str, agent_data: AgentUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    agent = get_agent_by_id(agent_id, db)
+    agent = await get_agent_by_id(agent_id, db)
     if not agent:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
     if agent.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to update this agent")
-    updated_agent = update_agent(agent_id, agent_data, db)
+    updated_agent = await update_agent(agent_id, agent_data, db)
     return updated_agent
 
 @agent_routes.delete("/sessions/{session_id}/agents/{agent_id}")
 async def delete_existing_agent(session_id: str, agent_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    agent = get_agent_by_id(agent_id, db)
+    agent = await get_agent_by_id(agent_id, db)
     if not agent:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
     if agent.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to delete this agent")
-    success = delete_agent(agent_id, db)
+    success = await delete_agent(agent_id, db)
     if not success:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to delete agent")
     return {"message": "Agent deleted successfully"}
 
-@agent_routes.post("/sessions/{session_id}/agents/{agent_id}/prepare")
+@agent_routes.get("/admin/chains")
+async def list_resident_chains(current_user: User = Depends(get_current_user)):
+    if not current_user.isadmin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to view resident agents")
+    return {"cache": chains_cache.stats(), "agents": chains_cache.resident()}
+
+@agent_routes.post("/sessions/{session_id}/agents/{agent_id}/prepare", response_model=IngestionJobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def prepare_agent(
     session_id: str,
     agent_id: str,
@@ -76,34 +109,94 @@ async def prepare_agent(
     current_user: User = Depends(get_current_user)
 ):
     logger.info(f"Preparing agent {agent_id} for session {session_id}")
-    agent = get_agent_by_id(agent_id, db)
+    agent = await get_agent_by_id(agent_id, db)
     if not agent:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
     if agent.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to prepare this agent")
     
-    document_path = None
     if pdf_file:
-        # Save the uploaded PDF file
-        file_location = f"documents/{pdf_file.filename}"
-        with open(file_location, "wb+") as file_object:
-            file_object.write(await pdf_file.read())
-        document_path = file_location
+        # Stream the upload to content-addressed storage and add it to the
+        # agent's document set; only its chunks get embedded
+        stored = await save_upload(pdf_file)
+        await add_document(agent_id, stored["path"], pdf_file.filename, db, digest=stored["sha256"])
 
-    try:
-        # Call the function to prepare the RAG chain
-        result = prepare_rag_chain(agent_id, instructions, [document_path] if document_path else [], db)
-        
-        if result.get("chain"):
-            chains_cache[agent_id] = result["chain"]
-            logger.info(f"RAG chain for agent {agent_id} has been cached")
-            return {"message": "Agent prepared successfully"}
-        else:
-            logger.error(f"Failed to prepare RAG chain for agent {agent_id}")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to prepare RAG chain")
-    except Exception as e:
-        logger.error(f"Error preparing agent: {str(e)}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    # Parsing, embedding and indexing run on the ingestion workers; the
+    # client polls the job until it is ready
+    return await queue_preparation(agent, instructions, db, current_user)
+
+async def queue_preparation(agent, instructions: str, db: Session, current_user: User):
+    documents = await list_documents(agent.id, db)
+    docs = [document.path for document in documents if document.status in INDEXED_STATES]
+    job = await create_job(agent.id, agent.session_id, current_user.id, instructions, docs, db)
+    logger.info(f"Queued ingestion job {job.id} for agent {agent.id}")
+    return job
+
+async def get_owned_agent(agent_id: str, db: Session, current_user: User):
+    agent = await get_agent_by_id(agent_id, db)
+    if not agent:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
+    if agent.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to modify this agent")
+    return agent
+
+@agent_routes.get("/sessions/{session_id}/agents/{agent_id}/documents", response_model=List[AgentDocumentResponse])
+async def get_agent_documents(session_id: str, agent_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    await get_owned_agent(agent_id, db, current_user)
+    return await list_documents(agent_id, db)
+
+@agent_routes.delete("/sessions/{session_id}/agents/{agent_id}/documents/{document_id}", response_model=IngestionJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def remove_agent_document(session_id: str, agent_id: str, document_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    agent = await get_owned_agent(agent_id, db, current_user)
+    document = await remove_document(agent_id, document_id, db)
+    if not document:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    # The removed document's vectors are deleted by the ingestion worker
+    return await queue_preparation(agent, agent.prompt_template, db, current_user)
+
+async def get_owned_job(agent_id: str, job_id: str, db: Session, current_user: User):
+    job = await get_job(job_id, db)
+    if not job or job.agent_id != agent_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Preparation job not found")
+    if job.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to view this preparation job")
+    return job
+
+@agent_routes.get("/sessions/{session_id}/agents/{agent_id}/prepare/{job_id}", response_model=IngestionJobResponse)
+async def get_prepare_status(session_id: str, agent_id: str, job_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return await get_owned_job(agent_id, job_id, db, current_user)
+
+@agent_routes.delete("/sessions/{session_id}/agents/{agent_id}/prepare/{job_id}", response_model=IngestionJobResponse)
+async def cancel_prepare(session_id: str, agent_id: str, job_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    await get_owned_job(agent_id, job_id, db, current_user)
+    return await cancel_job(job_id, db)
+
+async def get_agent_retriever(agent, db: Session, current_user: User):
+    logger.info("Retrieving agent retriever from cache")
+    retriever = chains_cache.get(agent.id)
+    if retriever:
+        return retriever
+    # None for agents without documents; they answer from the LLM alone
+    documents = await list_documents(agent.id, db)
+    if not any(document.status in INDEXED_STATES for document in documents):
+        return None
+    # Cheap path first: rebuild from the persisted index without re-embedding
+    retriever = await asyncio.to_thread(restore_retriever, agent.id)
+    if retriever:
+        chains_cache[agent.id] = retriever
+        logger.info(f"Retriever restored from persisted index for agent {agent.id}")
+        return retriever
+    # Indexes are only ever built by ingestion jobs, under the agent's lock;
+    # hand the client the job to poll instead of building in the request
+    job = await get_active_job(agent.id, db)
+    if job is None:
+        logger.warning(f"No index for agent {agent.id}, queueing a preparation job")
+        job = await queue_preparation(agent, agent.prompt_template, db, current_user)
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail={"message": "The agent is being prepared, try again once the job is ready", "job_id": job.id},
+        headers={"Retry-After": "5"},
+    )
 
 @agent_routes.post("/sessions/{session_id}/agents/{agent_id}/chat", response_model=ChatResponse)
 async def chat_with_agent(
@@ -115,30 +208,28 @@ async def chat_with_agent(
 ):
     logger.info(f"Chat request received for session {session_id}, agent {agent_id}")
     try:
-        agent = get_agent_by_id(agent_id, db)
+        agent = await get_agent_by_id(agent_id, db)
         if not agent:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
         if agent.user_id != current_user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to chat with this agent")
         
-        logger.info("Retrieving RAG chain from cache")
-        chain = chains_cache.get(agent_id)
-        if not chain:
-            logger.warning(f"RAG chain not found in cache for agent {agent_id}. Attempting to recreate...")
-            # Attempt to recreate the chain
-            result = prepare_rag_chain(agent_id, agent.prompt_template, json.loads(agent.document_paths), db)
-            chain = result.get("chain")
-            if not chain:
-                raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to recreate RAG chain")
-            chains_cache[agent_id] = chain
-            logger.info(f"RAG chain recreated and cached for agent {agent_id}")
-        
-        logger.info("Generating response using RAG chain")
-        response = chain.invoke(chat_data.message)
-        logger.info(f"Raw response: {response}")
-        
-        answer = response['answer'] if isinstance(response, dict) and 'answer' in response else str(response)
-        logger.info(f"Extracted answer: {answer}")
+        version = current_index_hash(agent_id) or "none"
+        chat_history = await conversation_store.history(agent_id, current_user.id, session_id, db)
+        cached = await asyncio.to_thread(response_cache.lookup, agent_id, version, chat_data.message, chat_history)
+        if cached.answer is not None:
+            logger.info(f"Answer served from the response cache ({cached.match} match)")
+            answer = cached.answer
+        else:
+            retriever = await get_agent_retriever(agent, db, current_user)
+
+            logger.info("Generating response using the RAG engine")
+            response = await inference_scheduler.run(agent_id, rag_engine.invoke, retriever, chat_data.message, chat_history)
+            logger.debug(f"Raw response: {response}")
+
+            answer = response['answer'] if isinstance(response, dict) and 'answer' in response else str(response)
+            logger.debug(f"Extracted answer: {answer}")
+            response_cache.store(agent_id, version, chat_data.message, answer, cached.vector, chat_history)
         
         logger.info("Saving chat interaction")
         new_chat = Chat(
@@ -149,9 +240,8 @@ async def chat_with_agent(
             response=answer,
             created_at=datetime.utcnow()
         )
-        db.add(new_chat)
-        db.commit()
-        db.refresh(new_chat)
+        await chat_log.record(new_chat, db)
+        conversation_store.append(agent_id, current_user.id, session_id, chat_data.message, answer, new_chat.id)
         
         logger.info("Chat interaction saved successfully")
         return ChatResponse(
@@ -163,13 +253,123 @@ async def chat_with_agent(
             response=new_chat.response,
             created_at=new_chat.created_at
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in chat_with_agent: {str(e)}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
+@agent_routes.post("/sessions/{session_id}/agents/{agent_id}/chat/stream")
+async def stream_chat_with_agent(
+    session_id: str,
+    agent_id: str,
+    chat_data: ChatCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    logger.info(f"Streaming chat request received for session {session_id}, agent {agent_id}")
+    agent = await get_agent_by_id(agent_id, db)
+    if not agent:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
+    if agent.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to chat with this agent")
+    version = current_index_hash(agent_id) or "none"
+    chat_history = await conversation_store.history(agent_id, current_user.id, session_id, db)
+    cached = await asyncio.to_thread(response_cache.lookup, agent_id, version, chat_data.message, chat_history)
+    if cached.answer is None:
+        retriever = await get_agent_retriever(agent, db, current_user)
+        inference_scheduler.check_capacity(agent_id)
+    user_id = current_user.id
+
+    async def event_stream():
+        if cached.answer is not None:
+            # A cached answer goes out as a single token event
+            logger.info(f"Streamed answer served from the response cache ({cached.match} match)")
+            answer = cached.answer
+            yield sse_event("token", {"token": answer})
+        else:
+            loop = asyncio.get_running_loop()
+            tokens = asyncio.Queue()
+            handler = TokenQueueHandler(loop, tokens)
+            invoke = partial(rag_engine.invoke, retriever, chat_data.message, chat_history, config={"callbacks": [handler]})
+            task = asyncio.create_task(inference_scheduler.run(agent_id, invoke))
+            task.add_done_callback(lambda _: tokens.put_nowait(None))
+
+            while True:
+                token = await tokens.get()
+                if token is None:
+                    break
+                yield sse_event("token", {"token": token})
+
+            try:
+                response = task.result()
+            except HTTPException as e:
+                yield sse_event("error", {"detail": e.detail})
+                return
+            except Exception as e:
+                logger.error(f"Error in stream_chat_with_agent: {str(e)}", exc_info=True)
+                yield sse_event("error", {"detail": str(e)})
+                return
+            answer = response['answer'] if isinstance(response, dict) and 'answer' in response else str(response)
+            response_cache.store(agent_id, version, chat_data.message, answer, cached.vector, chat_history)
+
+        # The request's session is gone once streaming starts, so in sync
+        # mode the chat log writes the row through a session of its own
+        new_chat = Chat(
+            session_id=session_id,
+            agent_id=agent_id,
+            user_id=user_id,
+            message=chat_data.message,
+            response=answer,
+            created_at=datetime.utcnow()
+        )
+        try:
+            await chat_log.record(new_chat)
+        except HTTPException as e:
+            yield sse_event("error", {"detail": e.detail})
+            return
+        conversation_store.append(agent_id, user_id, session_id, chat_data.message, answer, new_chat.id)
+        logger.info("Streamed chat interaction saved successfully")
+        yield sse_event("done", ChatResponse(
+            id=str(new_chat.id),
+            session_id=new_chat.session_id,
+            agent_id=new_chat.agent_id,
+            user_id=new_chat.user_id,
+            message=new_chat.message,
+            response=new_chat.response,
+            created_at=new_chat.created_at
+        ))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@agent_routes.get("/sessions/{session_id}/agents/{agent_id}/chat/history", response_model=ChatHistoryResponse)
+async def get_chat_history(
+    session_id: str,
+    agent_id: str,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    agent = await get_agent_by_id(agent_id, db)
+    if not agent:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
+    if agent.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to read this agent's history")
+    await chat_log.flush()
+    try:
+        chats, next_cursor = await list_chat_history(agent_id, current_user.id, session_id, db, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"items": chats, "next_cursor": next_cursor}
+
 @agent_routes.get("/sessions/{session_id}/agents/{agent_id}/chat", response_class=HTMLResponse, name="chat_page")
 async def chat_page(request: Request, session_id: str, agent_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    agent = get_agent_by_id(agent_id, db)
+    agent = await get_agent_by_id(agent_id, db)
     if not agent:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
     return templates.TemplateResponse("chat.html", {"request": request, "session_id": session_id, "agent_id": agent_id, "current_user": current_user})
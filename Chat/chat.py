@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession as Session
 from typing import List
 from schemas.ChatSchemas import ChatCreate, ChatResponse
 from Services.db_config import get_db
 from Services.auth import get_current_user
 from Services.agent_management import get_agent_by_id, chains_cache
+from Services.inference import inference_scheduler
+from Services.rag_engine import rag_engine
+from Services.conversation_memory import conversation_store
 from models.UserModels import User
 from models.ChatModels import Chat
 from fastapi.templating import Jinja2Templates
@@ -17,19 +20,20 @@ templates = Jinja2Templates(directory="templates")
 
 @chat_routes.post("/sessions/{session_id}/agents/{agent_id}/chat", response_model=ChatResponse)
 async def chat_with_agent(session_id: str, agent_id: str, chat_data: ChatCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    agent = get_agent_by_id(agent_id, db)
+    agent = await get_agent_by_id(agent_id, db)
     if not agent:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
     if agent.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to chat with this agent")
     
-    # Retrieve the RAG chain from the cache
-    chain = chains_cache.get(agent_id)
-    if not chain:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="RAG chain not found for this agent")
+    # Retrieve the agent's retriever from the cache
+    retriever = chains_cache.get(agent_id)
+    if not retriever:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Retriever not found for this agent")
     
-    # Generate the response using the RAG chain
-    response = chain.invoke(chat_data.message)
+    # Generate the response using the shared RAG engine
+    chat_history = await conversation_store.history(agent_id, current_user.id, session_id, db)
+    response = await inference_scheduler.run(agent_id, rag_engine.invoke, retriever, chat_data.message, chat_history)
     
     # Save the chat interaction
     new_chat = Chat(
@@ -37,18 +41,19 @@ async def chat_with_agent(session_id: str, agent_id: str, chat_data: ChatCreate,
         agent_id=agent_id,
         user_id=current_user.id,
         message=chat_data.message,
-        response=response.content,
+        response=response["answer"],
         created_at=datetime.utcnow()
     )
     db.add(new_chat)
-    db.commit()
-    db.refresh(new_chat)
+    await db.commit()
+    await db.refresh(new_chat)
+    conversation_store.append(agent_id, current_user.id, session_id, chat_data.message, new_chat.response, new_chat.id)
     
     return new_chat
 
 @chat_routes.get("/sessions/{session_id}/agents/{agent_id}/chat", response_class=HTMLResponse, name="chat_page")
 async def chat_page(request: Request, session_id: str, agent_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    agent = get_agent_by_id(agent_id, db)
+    agent = await get_agent_by_id(agent_id, db)
     if not agent:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
     return templates.TemplateResponse("chat.html", {"request": request, "session_id": session_id, "agent_id": agent_id, "current_user": current_user})
\ No newline at end of file
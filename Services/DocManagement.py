@@ -0,0 +1,128 @@
+from fastapi import UploadFile, HTTPException, status
+from fastapi.responses import JSONResponse
+from dotenv import load_dotenv
+import asyncio
+import hashlib
+import logging
+import uuid
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DOCUMENTS_DIR = os.getenv("DOCUMENTS_DIR", "documents")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+ALLOWED_EXTENSIONS = (".pdf", ".docx", ".doc", ".txt")
+# Room for the multipart boundaries and the other form fields around the file
+UPLOAD_FORM_OVERHEAD = int(os.getenv("UPLOAD_FORM_OVERHEAD", str(1024 * 1024)))
+
+def document_path(digest: str, extension: str) -> str:
+    return os.path.join(DOCUMENTS_DIR, f"{digest}{extension}")
+
+def _too_large() -> JSONResponse:
+    return JSONResponse(
+        {"detail": f"File exceeds the {MAX_UPLOAD_BYTES} byte upload limit"},
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        headers={"Connection": "close"},
+    )
+
+# Starlette parses the whole multipart body into a SpooledTemporaryFile
+# before any route code runs, so save_upload's own check only fires after an
+# oversized upload has already been written to a temp file. This middleware
+# rejects multipart requests up front: from Content-Length when the client
+# sends one, otherwise as soon as the streamed body passes the limit.
+class UploadSizeLimit:
+    def __init__(self, app, max_body: int = MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD):
+        self.app = app
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            return await self.app(scope, receive, send)
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body:
+            logger.warning(f"Rejected {content_length.decode()} byte upload to {scope['path']} before reading it")
+            return await _too_large()(scope, receive, send)
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    # Answer now and make the app see a disconnect, so the
+                    # rest of the body is never read
+                    rejected = True
+                    logger.warning(f"Rejected streamed upload to {scope['path']} after {received} bytes")
+                    await _too_large()(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            # Once the 413 is out, whatever the app answers is dropped
+            if not rejected:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
+
+async def save_upload(upload: UploadFile) -> dict:
+    # Streams the upload to disk in fixed-size chunks, hashing as it goes, and
+    # stores it under its content hash so identical uploads share one file.
+    # Oversized requests are normally stopped earlier by UploadSizeLimit;
+    # the size check here covers callers outside that middleware.
+    extension = os.path.splitext(upload.filename or "")[1].lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported file type: {extension or 'unknown'}",
+        )
+
+    os.makedirs(DOCUMENTS_DIR, exist_ok=True)
+    tmp_path = os.path.join(DOCUMENTS_DIR, f".upload-{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as file_object:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File exceeds the {MAX_UPLOAD_BYTES} byte upload limit",
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(file_object.write, chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    path = document_path(digest.hexdigest(), extension)
+    deduplicated = os.path.exists(path)
+    if deduplicated:
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+    logger.info(f"Stored upload {upload.filename} ({size} bytes) at {path}{' (deduplicated)' if deduplicated else ''}")
+    return {
+        "path": path,
+        "sha256": digest.hexdigest(),
+        "size": size,
+        "filename": upload.filename,
+        "deduplicated": deduplicated,
+    }
@@ -1,31 +1,58 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.AgentsModels import Agent
+from models.AgentDocumentModels import AgentDocument
 from schemas.AgentSchemas import AgentCreate, AgentUpdate
 from datetime import datetime
+from typing import Optional
 from dotenv import load_dotenv
+import numpy as np
+import asyncio
+import logging
 import uuid
 import time
 import json
 import os
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_groq import ChatGroq
 from langchain_community.vectorstores import FAISS
-from langchain.memory import ConversationBufferMemory
-from langchain.chains.conversational_retrieval.base import ConversationalRetrievalChain
 from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader
-from langchain.storage import LocalFileStore
-from langchain.globals import set_llm_cache
 from langchain_core.documents.base import Document
-from langchain.embeddings import CacheBackedEmbeddings
-from langchain_community.cache import SQLiteCache
+from Services.chain_cache import ChainCache, CHAIN_CACHE_MAX_ENTRIES, CHAIN_CACHE_MAX_BYTES, CHAIN_CACHE_IDLE_TTL
+from Services.embeddings import get_embedding_service
+from Services.response_cache import response_cache
+from Services.conversation_memory import conversation_store
+from Services.llm_providers import create_llm
+from Services.embedding_cache import CachedEmbeddings, embedding_cache
+from Services.vector_store import file_hash, content_hash, has_index, load_index, save_index, delete_index, create_vectorstore
+from Services.ann_index import select_index_type, index_type_of, supports_removal
+from Services import document_registry
+from Services.loaders import StageTimer, iter_chunk_batches
+from Services.pagination import PAGE_SIZE, keyset_page, split_page
 load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Global dictionary to store chains
-chains_cache = {}
+# Chunks embedded between progress reports / cancellation checks
+EMBED_PROGRESS_BATCH = 256
 
-def create_agent(agent_data: AgentCreate, db: Session) -> Agent:
+# Splitter settings; part of the document registry key so changing them
+# re-splits instead of reusing stale chunks
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 10
+SPLITTER_KEY = f"character:{CHUNK_SIZE}:{CHUNK_OVERLAP}"
+
+def _no_progress(stage: str, percent: int):
+    pass
+
+def _not_cancelled():
+    pass
+
+# Bounded LRU/TTL cache of resident agent retrievers, keyed by agent id
+chains_cache = ChainCache(
+    max_entries=CHAIN_CACHE_MAX_ENTRIES,
+    max_bytes=CHAIN_CACHE_MAX_BYTES,
+    idle_ttl=CHAIN_CACHE_IDLE_TTL,
+)
+
+async def create_agent(agent_data: AgentCreate, db: AsyncSession) -> Agent:
     new_agent = Agent(
         id=str(uuid.uuid4()),
         name=agent_data.name,
@@ -35,142 +62,244 @@ def create_agent(agent_data: AgentCreate, db: Session) -> Agent:
         updated_at=datetime.utcnow()
     )
     db.add(new_agent)
-    db.commit()
-    db.refresh(new_agent)
+    await db.commit()
+    await db.refresh(new_agent)
     return new_agent
 
-def get_agents_by_session(session_id: str, db: Session):
-    return db.query(Agent).filter(Agent.session_id == session_id).all()
+async def get_agents_by_session(session_id: str, db: AsyncSession, limit: int = PAGE_SIZE, cursor: Optional[str] = None):
+    # Newest first; returns the page and the cursor for the next one
+    stmt = select(Agent).where(Agent.session_id == session_id)
+    result = await db.execute(keyset_page(stmt, Agent, limit, cursor))
+    return split_page(result.scalars().all(), limit)
 
-def get_agent_by_id(agent_id: str, db: Session) -> Agent:
-    return db.query(Agent).filter(Agent.id == agent_id).first()
+async def get_agent_by_id(agent_id: str, db: AsyncSession) -> Agent:
+    result = await db.execute(select(Agent).where(Agent.id == agent_id))
+    return result.scalars().first()
 
-def update_agent(agent_id: str, agent_data: AgentUpdate, db: Session) -> Agent:
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+async def update_agent(agent_id: str, agent_data: AgentUpdate, db: AsyncSession) -> Agent:
+    agent = await get_agent_by_id(agent_id, db)
     if agent:
         agent.name = agent_data.name
+        if agent_data.index_type is not None:
+            # Takes effect at the agent's next preparation
+            agent.index_type = agent_data.index_type
         agent.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(agent)
+        await db.commit()
+        await db.refresh(agent)
         return agent
     return None
 
-def delete_agent(agent_id: str, db: Session) -> bool:
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+async def delete_agent(agent_id: str, db: AsyncSession) -> bool:
+    agent = await get_agent_by_id(agent_id, db)
     if agent:
-        db.delete(agent)
-        db.commit()
+        await db.execute(delete(AgentDocument).where(AgentDocument.agent_id == agent_id))
+        await db.delete(agent)
+        await db.commit()
+        delete_index(agent_id)
+        chains_cache.pop(agent_id, None)
+        response_cache.invalidate(agent_id)
+        conversation_store.drop_agent(agent_id)
         return True
     return False
 
-def preprocessor(docs: list):
-    llm = ChatGroq(
-        model = os.getenv("MODEL_NAME"),
-        api_key=os.getenv("GROQ_API_KEY"),
-        temperature=0.4,
+def build_llm(streaming: bool = False):
+    # Provider is picked by LLM_PROVIDER; see Services/llm_providers.py
+    return create_llm(streaming=streaming)
+
+def split_documents(documents: list):
+    text_splitter = CharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return text_splitter.split_documents(documents)
+
+def chunk_ids(document_hash: str, count: int) -> list:
+    # Docstore ids carry the source document's hash so its vectors can be
+    # found and deleted when the document leaves the agent's set
+    return [f"{document_hash}:{position}" for position in range(count)]
+
+def indexed_documents(vectordb) -> dict:
+    # document hash -> docstore ids; None for indexes built before chunk ids
+    # carried a document hash, which can only be rebuilt in full
+    documents = {}
+    for docstore_id in vectordb.index_to_docstore_id.values():
+        document_hash, separator, _ = docstore_id.partition(":")
+        if not separator:
+            return None
+        documents.setdefault(document_hash, []).append(docstore_id)
+    return documents
+
+def build_vectordb(agent_id: str, docs: list, embedding, progress=_no_progress, stats: dict = None, index_type: str = "auto", check_cancelled=_not_cancelled):
+    stats = stats if stats is not None else {}
+    stats.update(document_registry.new_stats(len(docs)))
+
+    # Reuse the agent's persisted index when it was built from the same
+    # content and is still the right index type for its size
+    digest = content_hash(docs)
+    vectordb = load_index(agent_id, embedding, digest)
+    if vectordb is not None and index_type_of(vectordb.index) == select_index_type(vectordb.index.ntotal, index_type):
+        stats["index_reused"] = True
+        logger.debug(f"Loaded index for agent {agent_id} from disk: {vectordb.index.ntotal} chunks")
+        return vectordb
+
+    cached_embedder = CachedEmbeddings(embedding, embedding_cache, namespace=embedding.model_name)
+    timer = StageTimer()
+
+    def embed(chunk_texts):
+        started = time.perf_counter()
+        embedded = []
+        for start in range(0, len(chunk_texts), EMBED_PROGRESS_BATCH):
+            embedded.extend(cached_embedder.embed_documents(chunk_texts[start:start + EMBED_PROGRESS_BATCH]))
+        timer.add("embed", time.perf_counter() - started, len(chunk_texts))
+        return embedded
+
+    texts, vector_blocks, metadatas, ids = [], [], [], []
+    document_chunks = {}
+
+    def collect(documents: list):
+        # Each document is parsed, split and embedded once across all agents;
+        # an agent's index is composed from the registry's chunks and vectors.
+        # Pages are parsed in a process pool and flow through splitting and
+        # embedding in batches that are written to the registry as they
+        # arrive. The agent's chunk text is still gathered here for the
+        # docstore; vectors stay memory-mapped from the registry until the
+        # index is assembled, so peak memory is the finished index plus text.
+        for position, (document_hash, path) in enumerate(documents):
+            def stream_chunks(source):
+                for batch in iter_chunk_batches(source, split_documents, EMBED_PROGRESS_BATCH, timer):
+                    yield batch
+                    last = batch[-1].metadata
+                    done = (last.get("page", 0) + 1) / last.get("total_pages", 1)
+                    progress("embedding", 30 + int(55 * (position + done) / len(documents)))
+
+            chunks, document_vectors = document_registry.get_or_build(
+                document_hash,
+                path,
+                SPLITTER_KEY,
+                embedding.model_name,
+                stream_chunks=stream_chunks,
+                embed=embed,
+                stats=stats,
+            )
+            texts.extend(chunk.page_content for chunk in chunks)
+            metadatas.extend(chunk.metadata for chunk in chunks)
+            if len(chunks):
+                vector_blocks.append(document_vectors)
+            ids.extend(chunk_ids(document_hash, len(chunks)))
+            document_chunks[document_hash] = len(chunks)
+            progress("embedding", 30 + 55 * (position + 1) // len(documents))
+
+    # Otherwise update the current index: drop the vectors of documents no
+    # longer in the set and append only the new documents
+    wanted = {file_hash(path): path for path in docs}
+    vectordb = load_index(agent_id, embedding, writable=True)
+    indexed = indexed_documents(vectordb) if vectordb is not None else None
+    if indexed is None:
+        vectordb, indexed = None, {}
+    removed = [document_hash for document_hash in indexed if document_hash not in wanted]
+    added = [(document_hash, path) for document_hash, path in wanted.items() if document_hash not in indexed]
+    stats.update(documents_removed=len(removed), documents_added=len(added))
+
+    progress("parsing", 5)
+    collect(added)
+
+    kept = [document_hash for document_hash in indexed if document_hash in wanted]
+    target_type = select_index_type(sum(len(indexed[document_hash]) for document_hash in kept) + len(texts), index_type)
+    if vectordb is not None and (
+        index_type_of(vectordb.index) != target_type or (removed and not supports_removal(vectordb.index))
+    ):
+        # The corpus outgrew its index type, or vectors must be deleted from
+        # an index that cannot remove them: rebuild from the registry, which
+        # already holds every kept document's vectors
+        collect([(document_hash, wanted[document_hash]) for document_hash in kept])
+        vectordb = None
+        stats["mode"] = "rebuild"
+    else:
+        stats["mode"] = "incremental" if vectordb is not None else "full"
+    stats["index_type"] = target_type
+
+    progress("indexing", 85)
+    started = time.perf_counter()
+    vectors = np.vstack(vector_blocks) if vector_blocks else np.empty((0, 0), dtype=np.float32)
+    if vectordb is None:
+        vectordb = create_vectorstore(texts, vectors, metadatas, ids, embedding, target_type)
+    else:
+        if removed:
+            vectordb.delete([docstore_id for document_hash in removed for docstore_id in indexed[document_hash]])
+        if texts:
+            vectordb.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+        document_chunks.update({document_hash: len(indexed[document_hash]) for document_hash in kept})
+    # Last chance to abort: once saved, the new index is the agent's live one
+    check_cancelled()
+    save_index(agent_id, vectordb, digest)
+    timer.add("index", time.perf_counter() - started, len(texts))
+    stats["document_chunks"] = document_chunks
+    stats["timings"] = timer.report()
+    logger.debug(
+        f"Saved index for agent {agent_id}: {vectordb.index.ntotal} chunks, {stats['index_type']} ({stats['mode']}), "
+        f"{stats['documents_added']} documents added, {stats['documents_removed']} removed"
     )
-    
+    return vectordb
+
+def load_embedding_model():
+    # Shared process-wide model; loading it once is the expensive part
+    return get_embedding_service()
+
+def preprocessor(docs: list, agent_id: str, progress=_no_progress, stats: dict = None, index_type: str = "auto", check_cancelled=_not_cancelled):
     print(f"Length of docs: {len(docs)}")
     print(f"Docs: {docs}")
     
     print("Preprocessor called:")
-    all_documents = []
-    for file in docs:
-        if file.endswith('.pdf'):
-            loader = PyPDFLoader(file)
-            print(f" - Loading PDF: {file}")
-            all_documents.extend(loader.load())
-        elif file.endswith('.docx') or file.endswith('.doc'):
-            loader = Docx2txtLoader(file)
-            print(f" - Loading DOCX: {file}")
-            all_documents.extend(loader.load())
-        elif file.endswith('.txt'):
-            loader = TextLoader(file)
-            print(f" - Loading TXT: {file}")
-            all_documents.extend(loader.load())
-        else:
-            raise ValueError(f"Unsupported file type: {file}")
-    
-    print(f"Total documents loaded: {len(all_documents)}")
-    
-    # Split the documents into smaller chunks
-    text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=10)
-    documents = text_splitter.split_documents(all_documents)
-    print(f"Total documents after splitting: {len(documents)}")
-    
-    embedding=HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    store = LocalFileStore("./doc_parser/")
-    # Convert the document chunks to embedding and save them to the vector store
-    cached_embedder = CacheBackedEmbeddings.from_bytes_store(embedding, store, namespace=embedding.model_name)
-    vectordb = FAISS.from_documents(documents, embedding=cached_embedder)
-    vectordb.save_local("./doc_parser/")
-    
-    print("Vector database saved locally.")
-    message_history = ChatMessageHistory()
-
-    # Memory for Conversational Context
-    memory = ConversationBufferMemory(
-        memory_key="chat_history",
-        output_key="answer",
-        chat_memory=message_history,
-        return_messages=True,
-    )
-    
-    print("Memory created.")
-    
-    # Create Chain that uses the Chroma Vector Store
-    chain = ConversationalRetrievalChain.from_llm(
-        llm=llm, 
-        chain_type="stuff",
-        retriever=vectordb.as_retriever(),
-        memory=memory, 
-        return_source_documents=False,
-    )
-    
-    print("Chain created.")
+    embedding = load_embedding_model()
+    vectordb = build_vectordb(agent_id, docs, embedding, progress, stats, index_type, check_cancelled)
+    return build_retriever(vectordb)
+
+def restore_retriever(agent_id: str, embedding=None):
+    # Rebuild a retriever purely from the agent's persisted index; never re-embeds
+    if not has_index(agent_id):
+        return None
+    vectordb = load_index(agent_id, embedding or load_embedding_model())
+    if vectordb is None:
+        return None
+    return build_retriever(vectordb)
 
-    return chain
+def build_retriever(vectordb):
+    # Read-only view of the index, shared by every conversation with the
+    # agent; the LLMs and prompts live in Services/rag_engine.py
+    retriever = vectordb.as_retriever()
+    logger.debug(f"Retriever created: {vectordb.index.ntotal} chunks")
+    return retriever
 
-def run(docs: list):
-    chain = preprocessor(docs)
-    return chain
+def run(docs: list, agent_id: str, progress=_no_progress, stats: dict = None, index_type: str = "auto", check_cancelled=_not_cancelled):
+    retriever = preprocessor(docs, agent_id, progress, stats, index_type, check_cancelled)
+    return retriever
 
-def prepare_rag_chain(agent_id: str, instructions: str, docs: list, db: Session):
-    agent = get_agent_by_id(agent_id, db)
+def prepare_retriever(agent_id: str, docs: list, progress=_no_progress, stats: dict = None, index_type: str = "auto", check_cancelled=_not_cancelled):
+    # Blocking: parses, embeds and indexes. Call from a worker thread.
+    # Document reuse counts are written into `stats` when given;
+    # check_cancelled raises to abort before the new index goes live.
+    # Agents without documents have no retriever and answer from the LLM alone.
+    if docs:
+        return run(docs, agent_id, progress, stats, index_type, check_cancelled)
+    return None
+
+async def prepare_rag_retriever(agent_id: str, instructions: str, docs: list, db: AsyncSession):
+    agent = await get_agent_by_id(agent_id, db)
     if not agent:
         raise ValueError("Agent not found")
     
     # Process the instructions
     agent.prompt_template = instructions
     
-    # If documents are provided, process them
+    # If documents are provided, process them off the event loop
+    retriever = await asyncio.to_thread(prepare_retriever, agent_id, docs, index_type=agent.index_type or "auto")
     if docs:
-        chain = run(docs)
         agent.document_paths = json.dumps(docs)
-    else:
-        # Create a simple chain without document processing
-        llm = ChatGroq(
-            model = os.getenv("MODEL_NAME"),
-            api_key=os.getenv("GROQ_API_KEY"),
-            temperature=0.4,
-        )
-        memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            output_key="answer",
-            return_messages=True,
-        )
-        chain = ConversationalRetrievalChain.from_llm(
-            llm=llm, 
-            chain_type="stuff",
-            memory=memory, 
-            return_source_documents=False,
-        )
     
-    db.commit()
+    await db.commit()
     
-    # Store the chain in the global cache
-    chains_cache[agent_id] = chain
+    # Store the retriever in the global cache
+    if retriever is not None:
+        chains_cache[agent_id] = retriever
+    response_cache.invalidate(agent_id)
     
-    print("Chain prepared.")
-    return {"message": "Agent prepared successfully", "chain": chain}
+    logger.debug(f"Retriever prepared for agent {agent_id}")
+    return {"message": "Agent prepared successfully", "retriever": retriever}
 
@@ -0,0 +1,105 @@
+from dotenv import load_dotenv
+import numpy as np
+import logging
+import math
+import os
+import faiss
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Index types an agent can use. "auto" picks by corpus size:
+#   flat   exact search, O(N) per query; supports deleting vectors in place
+#   hnsw   graph search, no training, ~1.5x the memory of flat
+#   ivfpq  inverted lists of product-quantized codes, trained on a sample;
+#          a fraction of flat's memory for very large corpora
+INDEX_TYPES = ("auto", "flat", "hnsw", "ivfpq")
+
+ANN_HNSW_MIN_VECTORS = int(os.getenv("ANN_HNSW_MIN_VECTORS", "50000"))
+ANN_IVFPQ_MIN_VECTORS = int(os.getenv("ANN_IVFPQ_MIN_VECTORS", "1000000"))
+
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+# 0 derives nlist from the corpus size (4 * sqrt(N)) and the number of PQ
+# sub-quantizers from the dimension (d / 4 bytes per vector)
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+IVF_TRAIN_SAMPLE = int(os.getenv("IVF_TRAIN_SAMPLE", "200000"))
+PQ_M = int(os.getenv("PQ_M", "0"))
+PQ_NBITS = 8
+# k-means wants roughly this many training points per centroid
+TRAIN_POINTS_PER_CENTROID = 39
+
+def select_index_type(count: int, requested: str = "auto") -> str:
+    requested = requested or "auto"
+    if requested != "auto":
+        if requested == "ivfpq" and count < _min_ivfpq_vectors():
+            logger.warning(f"Too few vectors ({count}) to train IVF-PQ, using flat")
+            return "flat"
+        return requested
+    if count >= max(ANN_IVFPQ_MIN_VECTORS, _min_ivfpq_vectors()):
+        return "ivfpq"
+    if count >= ANN_HNSW_MIN_VECTORS:
+        return "hnsw"
+    return "flat"
+
+def _min_ivfpq_vectors() -> int:
+    # Enough points to train the 2^nbits PQ centroids
+    return TRAIN_POINTS_PER_CENTROID * (1 << PQ_NBITS)
+
+def _nlist(count: int) -> int:
+    nlist = IVF_NLIST or int(4 * math.sqrt(count))
+    return max(1, min(nlist, count // TRAIN_POINTS_PER_CENTROID))
+
+def _pq_m(dimension: int) -> int:
+    if PQ_M:
+        return PQ_M
+    m = max(1, dimension // 4)
+    while dimension % m:
+        m -= 1
+    return m
+
+def index_type_of(index) -> str:
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivfpq"
+    return "flat"
+
+def supports_removal(index) -> bool:
+    # LangChain's FAISS.delete() expects the index to renumber the vectors
+    # that remain, which only the flat index does
+    return index_type_of(index) == "flat"
+
+def configure_search(index):
+    # Search-time knobs are applied on every load so they can be tuned
+    # without rebuilding
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = IVF_NPROBE
+    return index
+
+def create_index(vectors: np.ndarray, index_type: str):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dimension = vectors.shape
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif index_type == "ivfpq":
+        nlist = _nlist(count)
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dimension), dimension, nlist, _pq_m(dimension), PQ_NBITS)
+        # Train on a random sample; k-means cost grows with the sample, not
+        # the corpus
+        sample = vectors
+        if count > IVF_TRAIN_SAMPLE:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(count, IVF_TRAIN_SAMPLE, replace=False)]
+        index.train(sample)
+        logger.info(f"Trained IVF-PQ index (nlist={nlist}, m={index.pq.M}) on {len(sample)} vectors")
+    else:
+        index = faiss.IndexFlatL2(dimension)
+    index.add(vectors)
+    return configure_search(index)
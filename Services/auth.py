@@ -1,10 +1,12 @@
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.UserModels import User
 from Services.db_config import get_db
+from Services.user_cache import user_cache
+from Services.passwords import password_hasher
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -13,13 +15,12 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    matches, _ = await password_hasher.verify(plain_password, hashed_password)
+    return matches
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -31,10 +32,24 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_user_by_username(username: str, db: Session = Depends(get_db)):
-    return db.query(User).filter(User.Username == username).first()
+async def get_user_by_username(username: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(User).where(User.Username == username))
+    return result.scalars().first()
+
+async def get_user_by_id(user_id: int, db: AsyncSession):
+    result = await db.execute(select(User).where(User.id == user_id))
+    return result.scalars().first()
+
+async def resolve_user(username: str, db: AsyncSession):
+    # Token subjects are resolved through the user cache; a miss loads the
+    # user once and serves the following requests for USER_CACHE_TTL
+    user = user_cache.get(username)
+    if user is None:
+        user = await get_user_by_username(username, db)
+        user_cache.put(user)
+    return user
 
-def get_current_user(request: Request, db: Session = Depends(get_db)):
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)):
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(
@@ -56,12 +71,12 @@ def get_current_user(request: Request, db: Session = Depends(get_db)):
     except JWTError:
         raise credentials_exception
 
-    user = get_user_by_username(username, db)
+    user = await resolve_user(username, db)
     if user is None:
         raise credentials_exception
     return user
 
-def get_optional_user(request: Request, db: Session = Depends(get_db)):
+async def get_optional_user(request: Request, db: AsyncSession = Depends(get_db)):
     token = request.cookies.get("access_token")
     if not token:
         return None
@@ -74,39 +89,48 @@ def get_optional_user(request: Request, db: Session = Depends(get_db)):
     except JWTError:
         return None
 
-    user = get_user_by_username(username, db)
+    user = await resolve_user(username, db)
     return user
 
-def authenticate_user(username: str, password: str, db: Session = Depends(get_db)):
-    user = get_user_by_username(username, db)
-    if not user:
-        return False
-    if not verify_password(password, user.Password):
+async def authenticate_user(username: str, password: str, db: AsyncSession = Depends(get_db)):
+    user = await get_user_by_username(username, db)
+    # Unknown users are verified against a dummy hash, so both paths cost
+    # the same
+    matches, new_hash = await password_hasher.verify(password, user.Password if user else None)
+    if not user or not matches:
         return False
+    if new_hash:
+        # Stored with another cost factor; upgrade it while we have the password
+        user.Password = new_hash
+        await db.commit()
+        user_cache.invalidate(user.Username)
     return user
 
-def create_user(user_data: dict, db: Session):
-    user_data["Password"] = get_password_hash(user_data["Password"])
+async def create_user(user_data: dict, db: AsyncSession):
+    user_data["Password"] = await get_password_hash(user_data["Password"])
     new_user = User(**user_data)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
-def update_user(user_id: int, user_data: dict, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def update_user(user_id: int, user_data: dict, db: AsyncSession = Depends(get_db)):
+    user = await get_user_by_id(user_id, db)
     if user:
+        previous_username = user.Username
         for key, value in user_data.items():
             setattr(user, key, value)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
+        user_cache.invalidate(previous_username, user.Username)
         return user
     return None
 
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    user = await get_user_by_id(user_id, db)
     if user:
-        db.delete(user)
-        db.commit()
+        await db.delete(user)
+        await db.commit()
+        user_cache.invalidate(user.Username)
         return {"message": "User deleted successfully"}
     return None
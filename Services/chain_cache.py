@@ -0,0 +1,184 @@
+from collections import OrderedDict
+from dotenv import load_dotenv
+import threading
+import logging
+import time
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+CHAIN_CACHE_MAX_ENTRIES = int(os.getenv("CHAIN_CACHE_MAX_ENTRIES", "32"))
+CHAIN_CACHE_MAX_BYTES = int(os.getenv("CHAIN_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+CHAIN_CACHE_IDLE_TTL = float(os.getenv("CHAIN_CACHE_IDLE_TTL", "3600"))
+
+def _find_vectorstore(chain):
+    retriever = getattr(chain, "retriever", None)
+    return getattr(retriever, "vectorstore", None) or getattr(chain, "vectorstore", None)
+
+def _index_bytes(vectorstore) -> int:
+    # Serialized size when loaded from disk, else raw float32 vectors
+    size = getattr(vectorstore, "index_bytes", None)
+    if size is not None:
+        return size
+    index = getattr(vectorstore, "index", None)
+    return index.ntotal * index.d * 4 if index is not None else 0
+
+def estimate_chain_bytes(chain) -> int:
+    # Rough resident size: in-memory index + chunk text. Memory-mapped
+    # indexes are left out; see estimate_mapped_bytes.
+    size = 0
+    vectorstore = _find_vectorstore(chain)
+    if not getattr(vectorstore, "index_mapped", False):
+        size += _index_bytes(vectorstore)
+    docstore = getattr(getattr(vectorstore, "docstore", None), "_dict", None)
+    if docstore:
+        size += sum(len(doc.page_content) for doc in docstore.values())
+    return size
+
+def estimate_mapped_bytes(chain) -> int:
+    # File-backed index pages the kernel can drop under memory pressure
+    vectorstore = _find_vectorstore(chain)
+    return _index_bytes(vectorstore) if getattr(vectorstore, "index_mapped", False) else 0
+
+class _Entry:
+    __slots__ = ("value", "size", "mapped", "created_at", "last_access", "hits")
+
+    def __init__(self, value, size: int, mapped: int = 0):
+        self.value = value
+        self.size = size
+        self.mapped = mapped
+        self.created_at = time.monotonic()
+        self.last_access = self.created_at
+        self.hits = 0
+
+# LRU cache of per-agent retrievers with an entry cap, an approximate byte
+# budget and idle-TTL expiry. Evicted agents are rebuilt on demand from
+# their persisted index (see Services/vector_store.py).
+class ChainCache:
+    def __init__(self, max_entries: int, max_bytes: int, idle_ttl: float, sizer=estimate_chain_bytes, mapped_sizer=estimate_mapped_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.sizer = sizer
+        self.mapped_sizer = mapped_sizer
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        # max_bytes bounds total_bytes (resident); mapped_bytes is reported only
+        self.total_bytes = 0
+        self.mapped_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, agent_id: str, default=None):
+        with self._lock:
+            self._expire_idle()
+            entry = self._entries.get(agent_id)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(agent_id)
+            entry.last_access = time.monotonic()
+            entry.hits += 1
+            self.hits += 1
+            return entry.value
+
+    def put(self, agent_id: str, value):
+        size = self.sizer(value)
+        mapped = self.mapped_sizer(value)
+        with self._lock:
+            self._remove(agent_id)
+            self._entries[agent_id] = _Entry(value, size, mapped)
+            self.total_bytes += size
+            self.mapped_bytes += mapped
+            self._expire_idle()
+            self._evict_over_budget(keep=agent_id)
+
+    def pop(self, agent_id: str, default=None):
+        with self._lock:
+            entry = self._remove(agent_id)
+            return entry.value if entry else default
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+            self.mapped_bytes = 0
+
+    def __setitem__(self, agent_id: str, value):
+        self.put(agent_id, value)
+
+    def __getitem__(self, agent_id: str):
+        value = self.get(agent_id)
+        if value is None:
+            raise KeyError(agent_id)
+        return value
+
+    def __contains__(self, agent_id: str) -> bool:
+        with self._lock:
+            return agent_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, agent_id: str):
+        entry = self._entries.pop(agent_id, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+            self.mapped_bytes -= entry.mapped
+        return entry
+
+    def _expire_idle(self):
+        if self.idle_ttl <= 0:
+            return
+        cutoff = time.monotonic() - self.idle_ttl
+        # Entries are kept in access order, so idle ones sit at the front
+        while self._entries:
+            agent_id, entry = next(iter(self._entries.items()))
+            if entry.last_access > cutoff:
+                break
+            self._remove(agent_id)
+            self.expirations += 1
+            logger.info(f"Chain for agent {agent_id} expired after {self.idle_ttl}s idle")
+
+    def _evict_over_budget(self, keep: str = None):
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            agent_id = next(iter(self._entries))
+            if agent_id == keep:
+                break
+            entry = self._remove(agent_id)
+            self.evictions += 1
+            logger.info(f"Evicted chain for agent {agent_id} (~{entry.size} bytes)")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "estimated_bytes": self.total_bytes,
+            "mapped_bytes": self.mapped_bytes,
+            "max_bytes": self.max_bytes,
+            "idle_ttl": self.idle_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def resident(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "agent_id": agent_id,
+                    "estimated_bytes": entry.size,
+                    "mapped_bytes": entry.mapped,
+                    "hits": entry.hits,
+                    "age_seconds": now - entry.created_at,
+                    "idle_seconds": now - entry.last_access,
+                }
+                for agent_id, entry in reversed(self._entries.items())
+            ]
@@ -0,0 +1,23 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.ChatModels import Chat
+from Services.pagination import InvalidCursor, keyset_page, split_page
+from typing import List, Optional, Tuple
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+async def list_chat_history(
+    agent_id: str,
+    user_id: int,
+    session_id: str,
+    db: AsyncSession,
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Chat], Optional[str]]:
+    # Newest first; each page is one range scan of ix_chats_agent_user_created.
+    # Returns the page and the cursor for the next (older) one, or None on
+    # the last page.
+    stmt = select(Chat).where(Chat.agent_id == agent_id, Chat.user_id == user_id, Chat.session_id == session_id)
+    chats = (await db.execute(keyset_page(stmt, Chat, limit, cursor))).scalars().all()
+    return split_page(chats, limit)
@@ -0,0 +1,206 @@
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.ChatModels import Chat
+from Services.db_config import setup_async_db
+from dotenv import load_dotenv
+from datetime import datetime
+from typing import List, Optional
+import asyncio
+import logging
+import time
+import uuid
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# "batched" answers as soon as the turn is queued and writes it with the
+# next batch, so a crash (not a clean shutdown) can lose the last
+# CHAT_LOG_FLUSH_INTERVAL_MS of turns; "sync" commits every turn before
+# responding
+CHAT_LOG_DURABILITY = os.getenv("CHAT_LOG_DURABILITY", "batched").lower()
+CHAT_LOG_BATCH_SIZE = int(os.getenv("CHAT_LOG_BATCH_SIZE", "100"))
+CHAT_LOG_FLUSH_INTERVAL_MS = float(os.getenv("CHAT_LOG_FLUSH_INTERVAL_MS", "50"))
+# Turns allowed to wait for a flush; past that, requests wait up to
+# CHAT_LOG_PUT_TIMEOUT seconds for room and then get a 503
+CHAT_LOG_MAX_PENDING = int(os.getenv("CHAT_LOG_MAX_PENDING", "10000"))
+CHAT_LOG_PUT_TIMEOUT = float(os.getenv("CHAT_LOG_PUT_TIMEOUT", "5"))
+CHAT_LOG_SHUTDOWN_TIMEOUT = float(os.getenv("CHAT_LOG_SHUTDOWN_TIMEOUT", "10"))
+
+# Write-behind log of chat turns. Routes hand it a finished Chat and answer
+# straight away; one background task drains the queue and commits up to
+# batch_size rows per transaction, so concurrent chats share one SQLite
+# write lock and one fsync instead of taking turns for their own.
+class ChatLog:
+    def __init__(self, durability: str, batch_size: int, flush_interval: float, max_pending: int, put_timeout: float):
+        if durability not in ("sync", "batched"):
+            raise ValueError(f"Unknown chat log durability {durability!r}; expected 'sync' or 'batched'")
+        self.durability = durability
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        self._queue = None
+        self._wakeup = None
+        self._progress = None
+        self._flusher = None
+        # Turns put on the queue and turns the flusher has finished with
+        # (written or dropped); flush() waits for the second to catch up
+        # with the first as it was when flush() was called
+        self._queued = 0
+        self._processed = 0
+        self._flush_target = 0
+        self.recorded = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.waits = 0
+        self.rejected = 0
+        self.flush_time_total = 0.0
+
+    def _start(self):
+        if self._flusher is None or self._flusher.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_pending)
+                self._wakeup = asyncio.Event()
+                self._progress = asyncio.Condition()
+            self._flusher = asyncio.create_task(self._run())
+
+    async def record(self, chat: Chat, db: Optional[AsyncSession] = None) -> Chat:
+        # Key and timestamp are set here so the caller can answer with the
+        # row before it is written
+        chat.id = chat.id or str(uuid.uuid4())
+        chat.created_at = chat.created_at or datetime.utcnow()
+        self.recorded += 1
+        if self.durability == "sync":
+            await self._write_now(chat, db)
+            return chat
+
+        self._start()
+        try:
+            self._queue.put_nowait(chat)
+        except asyncio.QueueFull:
+            self.waits += 1
+            try:
+                await asyncio.wait_for(self._queue.put(chat), self.put_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Chat log is backed up, try again shortly",
+                    headers={"Retry-After": "1"},
+                )
+        self._queued += 1
+        self._wakeup.set()
+        return chat
+
+    async def _write_now(self, chat: Chat, db: Optional[AsyncSession]):
+        if db is not None:
+            db.add(chat)
+            await db.commit()
+        else:
+            _, AsyncSessionLocal = setup_async_db()
+            async with AsyncSessionLocal() as own_db:
+                own_db.add(chat)
+                await own_db.commit()
+        self.written += 1
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval / 1000
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                # The queue is drained, so the batch holds every turn a
+                # waiting flush() is after; write it rather than holding out
+                # for the interval
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._flush_target > self._processed:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write_batch(batch)
+            finally:
+                self._processed += len(batch)
+                async with self._progress:
+                    self._progress.notify_all()
+
+    async def _write_batch(self, batch: List[Chat]):
+        start = time.perf_counter()
+        _, AsyncSessionLocal = setup_async_db()
+        try:
+            async with AsyncSessionLocal() as db:
+                db.add_all(batch)
+                await db.commit()
+            self.written += len(batch)
+        except Exception:
+            # One bad row should not cost the rest of the batch
+            logger.warning(f"Chat log batch of {len(batch)} failed, retrying row by row", exc_info=True)
+            for chat in batch:
+                try:
+                    async with AsyncSessionLocal() as db:
+                        db.add(chat)
+                        await db.commit()
+                    self.written += 1
+                except Exception:
+                    self.failed += 1
+                    logger.error(f"Dropping chat {chat.id} for agent {chat.agent_id}", exc_info=True)
+        self.batches += 1
+        self.flush_time_total += time.perf_counter() - start
+
+    async def flush(self):
+        # Returns once every turn queued before the call is committed; readers
+        # call it before querying chats so they see their own writes. Turns
+        # recorded while it waits are not waited for, so a steady stream of
+        # chats cannot hold a reader up.
+        if self._queue is None or self._processed >= self._queued:
+            return
+        target = self._queued
+        self._flush_target = max(self._flush_target, target)
+        self._start()
+        self._wakeup.set()
+        async with self._progress:
+            await self._progress.wait_for(lambda: self._processed >= target)
+
+    async def close(self, timeout: float = CHAT_LOG_SHUTDOWN_TIMEOUT):
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Chat log shutdown timed out with {self._queue.qsize()} turns unwritten")
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        self._flusher = None
+        self._queue = None
+        self._wakeup = None
+        self._progress = None
+        # Whatever a timed-out shutdown left queued is gone
+        self._processed = self._flush_target = self._queued
+
+    def stats(self) -> dict:
+        return {
+            "durability": self.durability,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_pending": self.max_pending,
+            "recorded": self.recorded,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch": self.written / self.batches if self.batches else 0.0,
+            "avg_flush_ms": self.flush_time_total / self.batches * 1000 if self.batches else 0.0,
+            "waits": self.waits,
+            "rejected": self.rejected,
+        }
+
+chat_log = ChatLog(CHAT_LOG_DURABILITY, CHAT_LOG_BATCH_SIZE, CHAT_LOG_FLUSH_INTERVAL_MS, CHAT_LOG_MAX_PENDING, CHAT_LOG_PUT_TIMEOUT)
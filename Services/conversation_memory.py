@@ -0,0 +1,252 @@
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from models.ChatModels import Chat
+from Services.chat_log import chat_log
+from dotenv import load_dotenv
+from typing import Tuple
+import threading
+import logging
+import time
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Prompt budget for the history handed to the chain each turn; the newest
+# turns that fit are kept, older ones drop out (or into the summary)
+MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "1500"))
+# Turns read back from the chats table when a conversation is not resident
+MEMORY_LOAD_TURNS = int(os.getenv("MEMORY_LOAD_TURNS", "20"))
+# Fold turns that leave the window into a rolling summary (one extra LLM
+# call per overflow, made in the background)
+MEMORY_SUMMARIZE = os.getenv("MEMORY_SUMMARIZE", "false").lower() == "true"
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", "300"))
+MEMORY_MAX_CONVERSATIONS = int(os.getenv("MEMORY_MAX_CONVERSATIONS", "10000"))
+MEMORY_IDLE_TTL = float(os.getenv("MEMORY_IDLE_TTL", "1800"))
+
+# Turns recorded but not yet appended can only be among the newest few
+CHAT_IDS_KEPT = max(MEMORY_LOAD_TURNS, 64)
+
+# Good enough for budgeting English text without loading a tokenizer
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = (
+    "Progressively summarize the conversation below, adding to the previous summary. "
+    "Keep facts, names and open questions; stay under {max_words} words.\n\n"
+    "Previous summary:\n{summary}\n\nNew lines of conversation:\n{lines}\n\nNew summary:"
+)
+
+def estimate_tokens(text: str) -> int:
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+def _turn_tokens(turn: Tuple[str, str]) -> int:
+    return estimate_tokens(turn[0]) + estimate_tokens(turn[1])
+
+class Conversation:
+    def __init__(self, key: tuple):
+        self.key = key
+        self.turns = deque()
+        self.tokens = 0
+        self.summary = ""
+        # Turns evicted from the window, waiting to be folded into the summary
+        self.overflow = []
+        # Ids of the newest turns loaded or appended. A turn can reach the
+        # conversation twice: read back from the chats table by a request
+        # that loaded it while the turn's own request was still recording
+        # it, then appended by that request.
+        self.chat_ids = deque(maxlen=CHAT_IDS_KEPT)
+        self.summarizing = False
+        self.last_access = time.monotonic()
+        self.lock = threading.Lock()
+
+    def messages(self) -> list:
+        with self.lock:
+            messages = []
+            if self.summary:
+                messages.append(SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+            for question, answer in self.turns:
+                messages.append(HumanMessage(content=question))
+                messages.append(AIMessage(content=answer))
+            return messages
+
+# Chat history per (agent, user, session). Each conversation keeps only the
+# newest turns that fit MEMORY_MAX_TOKENS, so prompt size stays flat however
+# long it runs. Conversations are loaded from the chats table on first use
+# and dropped again when idle or when the LRU cap is reached.
+class ConversationStore:
+    def __init__(self, max_tokens: int, load_turns: int, max_conversations: int, idle_ttl: float, summarize: bool = False):
+        self.max_tokens = max_tokens
+        self.load_turns = load_turns
+        self.max_conversations = max_conversations
+        self.idle_ttl = idle_ttl
+        self.summarize = summarize
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+        self._summarizer = None
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.turns_dropped = 0
+        self.summaries = 0
+        self.summary_failures = 0
+
+    def _get(self, key: tuple) -> Conversation:
+        with self._lock:
+            self._expire_idle()
+            conversation = self._conversations.get(key)
+            if conversation is not None:
+                self._conversations.move_to_end(key)
+                conversation.last_access = time.monotonic()
+            return conversation
+
+    def _expire_idle(self):
+        if self.idle_ttl <= 0:
+            return
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._conversations:
+            key, conversation = next(iter(self._conversations.items()))
+            if conversation.last_access > cutoff:
+                break
+            del self._conversations[key]
+            self.evictions += 1
+
+    def _insert(self, conversation: Conversation) -> Conversation:
+        with self._lock:
+            # Another request may have loaded it meanwhile; keep that one
+            existing = self._conversations.get(conversation.key)
+            if existing is not None:
+                return existing
+            self._conversations[conversation.key] = conversation
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+                self.evictions += 1
+            return conversation
+
+    async def get(self, agent_id: str, user_id: int, session_id: str, db: AsyncSession) -> Conversation:
+        key = (agent_id, user_id, session_id)
+        conversation = self._get(key)
+        if conversation is not None:
+            self.hits += 1
+            return conversation
+
+        # Turns still queued in the write-behind chat log are not in the
+        # table yet
+        await chat_log.flush()
+        result = await db.execute(
+            select(Chat.id, Chat.message, Chat.response)
+            .where(Chat.agent_id == agent_id, Chat.user_id == user_id, Chat.session_id == session_id)
+            .order_by(Chat.created_at.desc())
+            .limit(self.load_turns)
+        )
+        conversation = Conversation(key)
+        for chat_id, message, response in reversed(result.all()):
+            self._add_turn(conversation, message, response or "", chat_id)
+        self.loads += 1
+        return self._insert(conversation)
+
+    async def history(self, agent_id: str, user_id: int, session_id: str, db: AsyncSession) -> list:
+        conversation = await self.get(agent_id, user_id, session_id, db)
+        return conversation.messages()
+
+    def append(self, agent_id: str, user_id: int, session_id: str, question: str, answer: str, chat_id: str = None):
+        # Only resident conversations are updated; others are read back from
+        # the chats table, which already holds this turn, on their next use
+        conversation = self._get((agent_id, user_id, session_id))
+        if conversation is not None:
+            self._add_turn(conversation, question, answer, chat_id)
+
+    def _add_turn(self, conversation: Conversation, question: str, answer: str, chat_id: str = None):
+        turn = (question, answer)
+        with conversation.lock:
+            if chat_id is not None:
+                if chat_id in conversation.chat_ids:
+                    return
+                conversation.chat_ids.append(chat_id)
+            conversation.turns.append(turn)
+            conversation.tokens += _turn_tokens(turn)
+            # Always keep the latest turn, even if it alone is over budget
+            while conversation.tokens > self.max_tokens and len(conversation.turns) > 1:
+                dropped = conversation.turns.popleft()
+                conversation.tokens -= _turn_tokens(dropped)
+                self.turns_dropped += 1
+                if self.summarize:
+                    conversation.overflow.append(dropped)
+            if not conversation.overflow or conversation.summarizing:
+                return
+            conversation.summarizing = True
+        self._submit_summary(conversation)
+
+    def _submit_summary(self, conversation: Conversation):
+        with self._lock:
+            if self._summarizer is None:
+                self._summarizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+            summarizer = self._summarizer
+        summarizer.submit(self._fold_summary, conversation)
+
+    def _fold_summary(self, conversation: Conversation):
+        # Runs in the background so the turn that overflowed is not delayed
+        with conversation.lock:
+            overflow, conversation.overflow = conversation.overflow, []
+            summary = conversation.summary
+        try:
+            lines = "\n".join(f"Human: {question}\nAssistant: {answer}" for question, answer in overflow)
+            summary = summarize(summary, lines, MEMORY_SUMMARY_MAX_TOKENS)
+            self.summaries += 1
+        except Exception as e:
+            self.summary_failures += 1
+            logger.warning(f"Could not summarize conversation {conversation.key}: {str(e)}")
+        with conversation.lock:
+            conversation.summary = summary
+            conversation.summarizing = False
+            pending = bool(conversation.overflow)
+            if pending:
+                conversation.summarizing = True
+        if pending:
+            self._submit_summary(conversation)
+
+    def drop_agent(self, agent_id: str):
+        with self._lock:
+            for key in [key for key in self._conversations if key[0] == agent_id]:
+                del self._conversations[key]
+
+    def shutdown(self):
+        with self._lock:
+            if self._summarizer is not None:
+                self._summarizer.shutdown(wait=False, cancel_futures=True)
+                self._summarizer = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            conversations = list(self._conversations.values())
+        return {
+            "conversations": len(conversations),
+            "max_conversations": self.max_conversations,
+            "max_tokens": self.max_tokens,
+            "history_tokens": sum(conversation.tokens for conversation in conversations),
+            "loads": self.loads,
+            "hits": self.hits,
+            "evictions": self.evictions,
+            "turns_dropped": self.turns_dropped,
+            "summarize": self.summarize,
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+        }
+
+def summarize(summary: str, lines: str, max_tokens: int) -> str:
+    from Services.rag_engine import rag_engine
+    prompt = SUMMARY_PROMPT.format(max_words=max_tokens * 3 // 4, summary=summary or "(none)", lines=lines)
+    result = rag_engine.llm.invoke(prompt)
+    text = getattr(result, "content", str(result)).strip()
+    # The model does not always respect the length; the budget is a hard cap
+    return text[:max_tokens * CHARS_PER_TOKEN]
+
+conversation_store = ConversationStore(
+    max_tokens=MEMORY_MAX_TOKENS,
+    load_turns=MEMORY_LOAD_TURNS,
+    max_conversations=MEMORY_MAX_CONVERSATIONS,
+    idle_ttl=MEMORY_IDLE_TTL,
+    summarize=MEMORY_SUMMARIZE,
+)
@@ -0,0 +1,178 @@
+from langchain_core.documents.base import Document
+from dotenv import load_dotenv
+from datetime import datetime
+from contextlib import nullcontext
+from typing import Callable, Iterator, List, Optional
+import numpy as np
+import threading
+import logging
+import pickle
+import shutil
+import json
+import uuid
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Parsed chunks and their embeddings, stored once per document content and
+# shared by every agent prepared from that document:
+#   {DOCUMENT_STORE_DIR}/{file_hash}/manifest.json
+#   {DOCUMENT_STORE_DIR}/{file_hash}/chunks.pkl             -> pickled [Document] batches
+#   {DOCUMENT_STORE_DIR}/{file_hash}/vectors-{model}.npy    -> float32 [n, d]
+# Chunks are only reused when they were split with the same settings, and
+# vectors only when they came from the same embedding model.
+DOCUMENT_STORE_DIR = os.getenv("DOCUMENT_STORE_DIR", "./doc_parser/documents")
+# Stored chunks embedded per batch when only the vectors are missing
+REEMBED_BATCH = 256
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+def _document_lock(file_hash: str) -> threading.Lock:
+    # Two agents preparing the same new document compute it only once
+    with _locks_guard:
+        return _locks.setdefault(file_hash, threading.Lock())
+
+def document_dir(file_hash: str) -> str:
+    return os.path.join(DOCUMENT_STORE_DIR, file_hash)
+
+def _vectors_file(model_name: str) -> str:
+    return f"vectors-{model_name.replace('/', '__')}.npy"
+
+def _read_manifest(file_hash: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(document_dir(file_hash), "manifest.json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _write_atomic(path: str, write: Callable):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+def _write_manifest(file_hash: str, manifest: dict):
+    path = os.path.join(document_dir(file_hash), "manifest.json")
+    _write_atomic(path, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+
+def load_chunks(file_hash: str, splitter_key: str) -> Optional[List[Document]]:
+    manifest = _read_manifest(file_hash)
+    if manifest is None or manifest.get("splitter") != splitter_key:
+        return None
+    chunks = []
+    try:
+        with open(os.path.join(document_dir(file_hash), "chunks.pkl"), "rb") as f:
+            # One pickled list per batch (a single list in older entries)
+            while True:
+                try:
+                    chunks.extend(pickle.load(f))
+                except EOFError:
+                    return chunks
+    except FileNotFoundError:
+        return None
+
+def load_vectors(file_hash: str, model_name: str) -> Optional[np.ndarray]:
+    # Memory-mapped: pages are read in as the index is assembled
+    path = os.path.join(document_dir(file_hash), _vectors_file(model_name))
+    try:
+        return np.load(path, mmap_mode="r")
+    except FileNotFoundError:
+        return None
+
+def _save_npy(path: str, raw_path: str, count: int, dimension: int):
+    # Wraps the raw float32 rows written batch by batch in an .npy header
+    def write(f):
+        np.lib.format.write_array_header_1_0(f, {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+            "fortran_order": False,
+            "shape": (count, dimension) if count else (0,),
+        })
+        with open(raw_path, "rb") as raw:
+            shutil.copyfileobj(raw, f, 1024 * 1024)
+    _write_atomic(path, write)
+
+def _build(file_hash: str, source: str, splitter_key: str, model_name: str, batches, embed: Callable, write_chunks: bool) -> int:
+    # Embeds and writes one batch at a time, so only the batch in flight is
+    # held in memory. Returns the number of chunks.
+    base_dir = document_dir(file_hash)
+    if write_chunks and os.path.isdir(base_dir):
+        # New chunks invalidate any vectors computed from an older split
+        shutil.rmtree(base_dir, ignore_errors=True)
+    os.makedirs(base_dir, exist_ok=True)
+    suffix = uuid.uuid4().hex
+    chunks_tmp = os.path.join(base_dir, f"chunks.pkl.{suffix}.tmp")
+    vectors_tmp = os.path.join(base_dir, f"vectors.{suffix}.tmp")
+    count, dimension = 0, 0
+    try:
+        with open(vectors_tmp, "wb") as vectors_file, (open(chunks_tmp, "wb") if write_chunks else nullcontext()) as chunks_file:
+            for batch in batches:
+                vectors = np.asarray(embed([chunk.page_content for chunk in batch]), dtype=np.float32)
+                vectors_file.write(vectors.tobytes())
+                if chunks_file is not None:
+                    pickle.dump(batch, chunks_file)
+                count += len(batch)
+                dimension = vectors.shape[1] if vectors.ndim == 2 else dimension
+
+        if write_chunks:
+            os.replace(chunks_tmp, os.path.join(base_dir, "chunks.pkl"))
+            _write_manifest(file_hash, {
+                "file_hash": file_hash,
+                "source": source,
+                "splitter": splitter_key,
+                "chunks": count,
+                "models": [],
+                "created_at": datetime.utcnow().isoformat(),
+            })
+        _save_npy(os.path.join(base_dir, _vectors_file(model_name)), vectors_tmp, count, dimension)
+        manifest = _read_manifest(file_hash) or {"file_hash": file_hash, "models": []}
+        if model_name not in manifest["models"]:
+            manifest["models"].append(model_name)
+        _write_manifest(file_hash, manifest)
+        return count
+    finally:
+        for tmp_path in (chunks_tmp, vectors_tmp):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+def get_or_build(
+    file_hash: str,
+    source: str,
+    splitter_key: str,
+    model_name: str,
+    stream_chunks: Callable[[str], Iterator[List[Document]]],
+    embed: Callable[[List[str]], list],
+    stats: dict,
+):
+    # Returns (chunks, vectors) for one document, parsing and embedding only
+    # what the registry does not already hold. New documents are embedded
+    # and written batch by batch as stream_chunks() yields them; vectors
+    # come back memory-mapped from the registry file.
+    with _document_lock(file_hash):
+        chunks = load_chunks(file_hash, splitter_key)
+        vectors = load_vectors(file_hash, model_name) if chunks is not None else None
+        if chunks is not None and vectors is not None and len(vectors) == len(chunks):
+            stats["documents_reused"] += 1
+            stats["chunks_reused"] += len(chunks)
+            return chunks, vectors
+
+        if chunks is None:
+            batches = stream_chunks(source)
+            stats["documents_parsed"] += 1
+        else:
+            # Split already stored; only the vectors are new
+            batches = (chunks[start:start + REEMBED_BATCH] for start in range(0, len(chunks), REEMBED_BATCH))
+            stats["documents_reused"] += 1
+        stats["chunks_embedded"] += _build(file_hash, source, splitter_key, model_name, batches, embed, chunks is None)
+        return load_chunks(file_hash, splitter_key), load_vectors(file_hash, model_name)
+
+def new_stats(documents: int) -> dict:
+    return {
+        "documents": documents,
+        "documents_parsed": 0,
+        "documents_reused": 0,
+        "chunks_embedded": 0,
+        "chunks_reused": 0,
+        "index_reused": False,
+    }
@@ -0,0 +1,118 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.AgentDocumentModels import AgentDocument
+from models.AgentsModels import Agent
+from Services.vector_store import file_hash
+from datetime import datetime
+from typing import List
+import json
+import os
+
+# The documents an agent is prepared from. Uploads and removals only change
+# this set; an ingestion job then brings the agent's index in line with it,
+# embedding added documents and deleting removed ones by chunk id.
+INDEXED_STATES = ("pending", "ready")
+
+def _backfill(db: Session, agent: Agent) -> List[AgentDocument]:
+    # Agents prepared before the document set existed only have document_paths
+    documents = []
+    for path in json.loads(agent.document_paths or "[]"):
+        if not os.path.exists(path):
+            continue
+        document = AgentDocument(
+            agent_id=agent.id,
+            file_hash=file_hash(path),
+            path=path,
+            filename=os.path.basename(path),
+            status="ready",
+        )
+        db.add(document)
+        documents.append(document)
+    db.flush()
+    return documents
+
+def list_documents_sync(db: Session, agent_id: str) -> List[AgentDocument]:
+    documents = db.execute(
+        select(AgentDocument).where(AgentDocument.agent_id == agent_id).order_by(AgentDocument.created_at)
+    ).scalars().all()
+    if not documents:
+        agent = db.get(Agent, agent_id)
+        if agent is not None and agent.document_paths:
+            documents = _backfill(db, agent)
+    return list(documents)
+
+def add_document_sync(db: Session, agent_id: str, path: str, filename: str = None, digest: str = None) -> AgentDocument:
+    list_documents_sync(db, agent_id)
+    digest = digest or file_hash(path)
+    document = db.execute(
+        select(AgentDocument).where(AgentDocument.agent_id == agent_id, AgentDocument.file_hash == digest)
+    ).scalars().first()
+    if document is None:
+        document = AgentDocument(agent_id=agent_id, file_hash=digest, path=path, filename=filename, status="pending")
+        db.add(document)
+    elif document.status in ("removing", "failed"):
+        document.status = "pending" if document.status == "failed" else "ready"
+        document.error = None
+    return document
+
+def remove_document_sync(db: Session, agent_id: str, document_id: str) -> AgentDocument:
+    list_documents_sync(db, agent_id)
+    document = db.get(AgentDocument, document_id)
+    if document is None or document.agent_id != agent_id:
+        return None
+    if document.status in ("pending", "failed"):
+        # Never made it into the index; nothing to delete there
+        db.delete(document)
+    else:
+        document.status = "removing"
+    return document
+
+async def list_documents(agent_id: str, db: AsyncSession) -> List[AgentDocument]:
+    documents = await db.run_sync(lambda session: list_documents_sync(session, agent_id))
+    await db.commit()
+    return documents
+
+async def add_document(agent_id: str, path: str, filename: str, db: AsyncSession, digest: str = None) -> AgentDocument:
+    document = await db.run_sync(lambda session: add_document_sync(session, agent_id, path, filename, digest))
+    await db.commit()
+    await db.refresh(document)
+    return document
+
+async def remove_document(agent_id: str, document_id: str, db: AsyncSession) -> AgentDocument:
+    document = await db.run_sync(lambda session: remove_document_sync(session, agent_id, document_id))
+    await db.commit()
+    return document
+
+def target_documents(db: Session, agent_id: str) -> List[AgentDocument]:
+    # What the agent's index should hold right now
+    return [document for document in list_documents_sync(db, agent_id) if document.status in INDEXED_STATES]
+
+def settle_documents(db: Session, agent_id: str, target: List[str], chunks: dict = None, error: str = None):
+    # Record the outcome of a job that indexed `target` (file hashes).
+    # chunks maps file hash -> chunk count on success; error is set on failure.
+    now = datetime.utcnow()
+    for document in db.execute(select(AgentDocument).where(AgentDocument.agent_id == agent_id)).scalars():
+        if error is None:
+            if document.file_hash in target and document.status != "removing":
+                document.status = "ready"
+                document.error = None
+                document.chunks = chunks.get(document.file_hash, document.chunks) if chunks else document.chunks
+                document.updated_at = now
+            elif document.status == "removing" and document.file_hash not in target:
+                db.delete(document)
+        elif document.file_hash in target and document.status == "pending":
+            document.status = "failed"
+            document.error = error
+            document.updated_at = now
+
+    agent = db.get(Agent, agent_id)
+    if agent is not None and error is None:
+        paths = [
+            document.path for document in db.execute(
+                select(AgentDocument)
+                .where(AgentDocument.agent_id == agent_id, AgentDocument.status == "ready")
+                .order_by(AgentDocument.created_at)
+            ).scalars()
+        ]
+        agent.document_paths = json.dumps(paths) if paths else None
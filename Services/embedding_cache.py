@@ -0,0 +1,203 @@
+from langchain_core.embeddings import Embeddings
+from dotenv import load_dotenv
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+import threading
+import argparse
+import hashlib
+import logging
+import sqlite3
+import time
+import uuid
+import json
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Packed cache of document chunk embeddings: one SQLite file holding float32
+# blobs keyed by text hash, replacing LocalFileStore's one file per vector.
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./doc_parser/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# SQLite's default limit on bound parameters is 999
+LOOKUP_BATCH = 500
+
+# Keys match CacheBackedEmbeddings' default encoder (namespace + uuid5 of
+# the text's sha1) so entries migrated from the old LocalFileStore layout
+# are found again
+_KEY_NAMESPACE = uuid.UUID(int=1985)
+
+def cache_key(namespace: str, text: str) -> str:
+    sha1_hex = hashlib.sha1(text.encode("utf-8"), usedforsecurity=False).hexdigest()
+    return f"{namespace}{uuid.uuid5(_KEY_NAMESPACE, sha1_hex)}"
+
+class EmbeddingCache:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_access ON embeddings (last_access)")
+            self.total_bytes = conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        found = {}
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), LOOKUP_BATCH):
+                batch = keys[start:start + LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch)
+                found.update(rows.fetchall())
+            if found:
+                conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key in found])
+                conn.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return [np.frombuffer(found[key], dtype=np.float32) if key in found else None for key in keys]
+
+    def put_many(self, items: Iterable[Tuple[str, Iterable[float]]]):
+        now = time.time()
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connection()
+            replaced = 0
+            for start in range(0, len(rows), LOOKUP_BATCH):
+                batch = [row[0] for row in rows[start:start + LOOKUP_BATCH]]
+                placeholders = ",".join("?" * len(batch))
+                replaced += conn.execute(
+                    f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchone()[0]
+            conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows)
+            self.total_bytes += sum(len(row[1]) for row in rows) - replaced
+            self._evict_over_budget(conn)
+            conn.commit()
+
+    def _evict_over_budget(self, conn: sqlite3.Connection):
+        # Drop least recently used vectors until back under 90% of the budget
+        if self.total_bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        while self.total_bytes > target:
+            rows = conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_access LIMIT ?", (LOOKUP_BATCH,)
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                break
+            evicted = []
+            for key, size in rows:
+                if self.total_bytes <= target:
+                    break
+                evicted.append((key,))
+                self.total_bytes -= size
+            conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+            self.evictions += len(evicted)
+        logger.info(f"Embedding cache evicted down to {self.total_bytes} bytes")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+# Embeds documents through the cache: one batched lookup, one embed call
+# for all misses, one batched write. Queries are not cached.
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embedding: Embeddings, cache: EmbeddingCache, namespace: str):
+        self.embedding = embedding
+        self.cache = cache
+        self.namespace = namespace
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [cache_key(self.namespace, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.embedding.embed_documents([texts[i] for i in missing])
+            self.cache.put_many((keys[i], vector) for i, vector in zip(missing, computed))
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+        return [vector.tolist() if isinstance(vector, np.ndarray) else list(vector) for vector in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedding.embed_query(text)
+
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_BYTES)
+
+def migrate_local_file_store(root: str, cache: EmbeddingCache, subdir: str = "", remove: bool = False) -> int:
+    # Imports vectors written by LocalFileStore(root) under root/subdir into
+    # the packed cache; a file's path relative to root is its cache key
+    migrated = 0
+    batch = []
+    for dirpath, _, filenames in os.walk(os.path.join(root, subdir)):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            key = os.path.relpath(path, root).replace(os.sep, "/")
+            try:
+                with open(path, "rb") as f:
+                    vector = json.loads(f.read().decode())
+            except (ValueError, UnicodeDecodeError):
+                continue
+            if not isinstance(vector, list):
+                continue
+            batch.append((key, path, vector))
+            if len(batch) >= LOOKUP_BATCH:
+                migrated += _flush_migration(batch, cache, remove)
+                batch = []
+    migrated += _flush_migration(batch, cache, remove)
+    return migrated
+
+def _flush_migration(batch: list, cache: EmbeddingCache, remove: bool) -> int:
+    cache.put_many((key, vector) for key, _, vector in batch)
+    if remove:
+        for _, path, _ in batch:
+            os.remove(path)
+    return len(batch)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate a LocalFileStore embedding cache into the packed cache")
+    parser.add_argument("root", nargs="?", default="./doc_parser", help="root the LocalFileStore was opened on")
+    parser.add_argument("--subdir", default="sentence-transformers",
+                        help="directory under root holding one JSON vector per file")
+    parser.add_argument("--remove", action="store_true", help="delete the migrated files")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    count = migrate_local_file_store(args.root, embedding_cache, args.subdir, args.remove)
+    print(f"Migrated {count} vectors into {embedding_cache.path} in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,154 @@
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+from concurrent.futures import Future
+from dotenv import load_dotenv
+from typing import List
+import itertools
+import threading
+import logging
+import queue
+import time
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# 0 keeps the torch default (one thread per core)
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+# How long the encoder waits for other callers' texts before running a batch
+EMBEDDING_COALESCE_MS = float(os.getenv("EMBEDDING_COALESCE_MS", "5"))
+# Target number of texts merged into one encode() call
+EMBEDDING_MAX_BATCH_TEXTS = int(os.getenv("EMBEDDING_MAX_BATCH_TEXTS", "1024"))
+
+# Process-wide embedding model. The weights are loaded once; concurrent
+# embed_documents()/embed_query() callers hand their texts to a single
+# encoder thread that merges them into shared batches. Large documents are
+# submitted in slices and queries jump the queue, so a chat never waits
+# behind a whole preparation.
+QUERY_PRIORITY = 0
+DOCUMENT_PRIORITY = 1
+
+class EmbeddingService(Embeddings):
+    def __init__(self, model_name: str, batch_size: int, threads: int, coalesce_ms: float, max_batch_texts: int):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.threads = threads
+        self.coalesce_window = coalesce_ms / 1000
+        self.max_batch_texts = max_batch_texts
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._requests = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._worker = None
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.encode_seconds = 0.0
+        self.load_seconds = 0.0
+
+    @property
+    def model(self) -> HuggingFaceEmbeddings:
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    started = time.perf_counter()
+                    if self.threads:
+                        import torch
+                        torch.set_num_threads(self.threads)
+                    self._model = HuggingFaceEmbeddings(
+                        model_name=self.model_name,
+                        encode_kwargs={"batch_size": self.batch_size},
+                    )
+                    self.load_seconds = time.perf_counter() - started
+                    logger.info(f"Loaded embedding model {self.model_name} in {self.load_seconds:.2f}s")
+        return self._model
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._load_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name="embedding-encoder", daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._requests.get()[2:]]
+            pending = len(batch[0][0])
+            deadline = time.monotonic() + self.coalesce_window
+            while pending < self.max_batch_texts:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request[2:])
+                pending += len(request[2])
+            self._encode(batch)
+
+    def _encode(self, batch: list):
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        started = time.perf_counter()
+        try:
+            vectors = self.model.embed_documents(texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.encode_seconds += time.perf_counter() - started
+        self.batches += 1
+        offset = 0
+        for request_texts, future in batch:
+            future.set_result(vectors[offset:offset + len(request_texts)])
+            offset += len(request_texts)
+
+    def _submit(self, texts: list, priority: int) -> Future:
+        future = Future()
+        self._requests.put((priority, next(self._sequence), texts, future))
+        return future
+
+    def _embed(self, texts: List[str], priority: int) -> List[List[float]]:
+        if not texts:
+            return []
+        self._ensure_worker()
+        self.requests += 1
+        self.texts += len(texts)
+        texts = list(texts)
+        futures = [
+            self._submit(texts[start:start + self.max_batch_texts], priority)
+            for start in range(0, len(texts), self.max_batch_texts)
+        ]
+        return [vector for future in futures for vector in future.result()]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, DOCUMENT_PRIORITY)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], QUERY_PRIORITY)[0]
+
+    def stats(self) -> dict:
+        return {
+            "model_name": self.model_name,
+            "loaded": self._model is not None,
+            "load_seconds": self.load_seconds,
+            "batch_size": self.batch_size,
+            "requests": self.requests,
+            "texts": self.texts,
+            "batches": self.batches,
+            "avg_texts_per_batch": self.texts / self.batches if self.batches else 0.0,
+            "encode_seconds": self.encode_seconds,
+        }
+
+embedding_service = EmbeddingService(
+    model_name=EMBEDDING_MODEL_NAME,
+    batch_size=EMBEDDING_BATCH_SIZE,
+    threads=EMBEDDING_THREADS,
+    coalesce_ms=EMBEDDING_COALESCE_MS,
+    max_batch_texts=EMBEDDING_MAX_BATCH_TEXTS,
+)
+
+def get_embedding_service() -> EmbeddingService:
+    return embedding_service
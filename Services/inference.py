@@ -0,0 +1,166 @@
+from fastapi import HTTPException, status
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import asyncio
+import logging
+import time
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "8"))
+INFERENCE_PER_AGENT_LIMIT = int(os.getenv("INFERENCE_PER_AGENT_LIMIT", "2"))
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "64"))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "60"))
+
+class _AgentSlot:
+    __slots__ = ("semaphore", "users")
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        # Calls waiting for or holding the semaphore
+        self.users = 0
+
+# Runs blocking chain calls on a bounded thread pool, off the event loop.
+# Admission is capped by max_queue (requests in flight) and each
+# agent may only have per_agent_limit calls executing at once.
+class InferenceScheduler:
+    def __init__(self, workers: int, per_agent_limit: int, max_queue: int, timeout: float):
+        self.workers = workers
+        self.per_agent_limit = per_agent_limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = None
+        self._agent_slots = {}
+        self.pending = 0
+        self.waiting = 0
+        self.running = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.exec_time_total = 0.0
+        self.exec_time_max = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        return self._executor
+
+    def _slot(self, agent_id: str) -> _AgentSlot:
+        slot = self._agent_slots.get(agent_id)
+        if slot is None:
+            slot = self._agent_slots[agent_id] = _AgentSlot(self.per_agent_limit)
+        slot.users += 1
+        return slot
+
+    def _leave(self, agent_id: str, slot: _AgentSlot):
+        # Agents with nothing queued or running drop their entry, so the map
+        # only holds agents that are busy right now
+        slot.users -= 1
+        if slot.users == 0 and self._agent_slots.get(agent_id) is slot:
+            del self._agent_slots[agent_id]
+
+    def check_capacity(self, agent_id: str):
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            logger.warning(f"Inference queue full ({self.max_queue}), rejecting request for agent {agent_id}")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many chat requests in progress, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+    async def run(self, agent_id: str, fn, *args, timeout: float = None):
+        self.check_capacity(agent_id)
+        self.pending += 1
+        handed_off = []
+        try:
+            return await asyncio.wait_for(self._execute(agent_id, fn, args, handed_off), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.error(f"Inference for agent {agent_id} timed out after {timeout or self.timeout}s")
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="The agent took too long to respond")
+        finally:
+            # Once the call reached a worker thread, its completion callback
+            # gives the admission back; a timeout cannot free it early
+            if not handed_off:
+                self.pending -= 1
+
+    async def _execute(self, agent_id: str, fn, args, handed_off: list):
+        loop = asyncio.get_running_loop()
+        slot = self._slot(agent_id)
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await slot.semaphore.acquire()
+        except BaseException:
+            self._leave(agent_id, slot)
+            raise
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - queued_at
+        self.started += 1
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+
+        self.running += 1
+        started_at = time.perf_counter()
+        future = loop.run_in_executor(self.executor, fn, *args)
+        handed_off.append(True)
+
+        def release(_):
+            # The slot and the admission are held until the worker thread
+            # finishes, even when the caller gave up on a timeout, so the
+            # per-agent limit and max_queue stay honest
+            elapsed = time.perf_counter() - started_at
+            self.running -= 1
+            self.pending -= 1
+            self.exec_time_total += elapsed
+            self.exec_time_max = max(self.exec_time_max, elapsed)
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+            slot.semaphore.release()
+            self._leave(agent_id, slot)
+
+        future.add_done_callback(release)
+        return await asyncio.shield(future)
+
+    def snapshot(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "queue_length": self.waiting,
+            "running": self.running,
+            "in_flight": self.pending,
+            "max_queue": self.max_queue,
+            "workers": self.workers,
+            "per_agent_limit": self.per_agent_limit,
+            "busy_agents": len(self._agent_slots),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": (self.wait_time_total / self.started * 1000) if self.started else 0.0,
+            "max_wait_ms": self.wait_time_max * 1000,
+            "avg_exec_ms": (self.exec_time_total / finished * 1000) if finished else 0.0,
+            "max_exec_ms": self.exec_time_max * 1000,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+inference_scheduler = InferenceScheduler(
+    workers=INFERENCE_WORKERS,
+    per_agent_limit=INFERENCE_PER_AGENT_LIMIT,
+    max_queue=INFERENCE_MAX_QUEUE,
+    timeout=INFERENCE_TIMEOUT,
+)
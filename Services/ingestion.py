@@ -0,0 +1,206 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from concurrent.futures import ThreadPoolExecutor
+from models.IngestionJobModels import IngestionJob
+from models.AgentsModels import Agent
+from Services.db_config import setup_db, setup_async_db
+from Services.agent_management import prepare_retriever, chains_cache
+from Services.loaders import shutdown_loaders
+from Services.document_set import target_documents, settle_documents
+from Services.vector_store import delete_index
+from Services.response_cache import response_cache
+from dotenv import load_dotenv
+from datetime import datetime
+import threading
+import logging
+import json
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+
+# queued -> parsing -> embedding -> indexing -> ready, or failed/cancelled
+ACTIVE_STATES = ("queued", "parsing", "embedding", "indexing")
+FINAL_STATES = ("ready", "failed", "cancelled")
+
+_executor = None
+_agent_locks = {}
+_agent_locks_guard = threading.Lock()
+
+class JobCancelled(Exception):
+    pass
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=INGESTION_WORKERS, thread_name_prefix="ingestion")
+    return _executor
+
+def _update_job(job_id: str, **fields) -> IngestionJob:
+    _, Session = setup_db()
+    with Session() as db:
+        job = db.get(IngestionJob, job_id)
+        for key, value in fields.items():
+            setattr(job, key, value)
+        db.commit()
+        db.refresh(job)
+        db.expunge(job)
+        return job
+
+def _cancel_requested(job_id: str) -> bool:
+    _, Session = setup_db()
+    with Session() as db:
+        return bool(db.execute(select(IngestionJob.cancel_requested).where(IngestionJob.id == job_id)).scalar())
+
+def _agent_lock(agent_id: str) -> threading.Lock:
+    # One job per agent at a time: each applies its changes on top of the
+    # index the previous one saved
+    with _agent_locks_guard:
+        return _agent_locks.setdefault(agent_id, threading.Lock())
+
+def run_job(job_id: str):
+    _, Session = setup_db()
+    with Session() as db:
+        job = db.get(IngestionJob, job_id)
+        if job is None or job.status in FINAL_STATES:
+            return
+        agent_id = job.agent_id
+    with _agent_lock(agent_id):
+        _run_job(job_id, agent_id)
+
+def _run_job(job_id: str, agent_id: str):
+    _, Session = setup_db()
+    with Session() as db:
+        # Cancelled while waiting for the agent's previous job
+        if db.get(IngestionJob, job_id).status in FINAL_STATES:
+            return
+        # The document set is read when the job starts, so it includes any
+        # uploads or removals made while it was queued
+        documents = target_documents(db, agent_id)
+        docs = [document.path for document in documents]
+        target = [document.file_hash for document in documents]
+        index_type = db.get(Agent, agent_id).index_type or "auto"
+        db.commit()
+    job = _update_job(job_id, started_at=datetime.utcnow(), document_paths=json.dumps(docs))
+    last_reported = {"stage": None, "percent": -1}
+
+    def check_cancelled():
+        if _cancel_requested(job_id):
+            raise JobCancelled()
+
+    def progress(stage: str, percent: int):
+        # Persist stage changes and progress steps of at least 5%, checking
+        # for cancellation each time
+        if stage == last_reported["stage"] and percent - last_reported["percent"] < 5:
+            return
+        check_cancelled()
+        _update_job(job_id, status=stage, progress=percent)
+        last_reported.update(stage=stage, percent=percent)
+
+    stats = {}
+    try:
+        progress("parsing", 0)
+        # None when every document was removed
+        # The last cancellation check runs just before the new index is
+        # saved; after that it is live, so the job runs to completion
+        retriever = prepare_retriever(job.agent_id, docs, progress, stats, index_type, check_cancelled)
+
+        with Session() as db:
+            agent = db.get(Agent, job.agent_id)
+            if agent is None:
+                raise ValueError("Agent not found")
+            agent.prompt_template = job.instructions
+            settle_documents(db, job.agent_id, target, stats.get("document_chunks"))
+            db.commit()
+        if retriever is None:
+            delete_index(job.agent_id)
+            chains_cache.pop(job.agent_id, None)
+        else:
+            chains_cache[job.agent_id] = retriever
+        # Answers from the previous document set or instructions are stale
+        response_cache.invalidate(job.agent_id)
+        _update_job(job_id, status="ready", progress=100, stats=json.dumps(stats), finished_at=datetime.utcnow())
+        logger.info(f"Ingestion job {job_id} for agent {job.agent_id} is ready: {stats}")
+    except JobCancelled:
+        _settle_failed(job.agent_id, target, "Preparation cancelled")
+        _update_job(job_id, status="cancelled", finished_at=datetime.utcnow())
+        logger.info(f"Ingestion job {job_id} cancelled")
+    except Exception as e:
+        _settle_failed(job.agent_id, target, str(e))
+        _update_job(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+        logger.error(f"Ingestion job {job_id} failed: {str(e)}", exc_info=True)
+
+def _settle_failed(agent_id: str, target: list, error: str):
+    _, Session = setup_db()
+    with Session() as db:
+        settle_documents(db, agent_id, target, error=error)
+        db.commit()
+
+def submit_job(job_id: str):
+    _get_executor().submit(run_job, job_id)
+
+async def create_job(agent_id: str, session_id: str, user_id: int, instructions: str, docs: list, db: AsyncSession) -> IngestionJob:
+    job = IngestionJob(
+        agent_id=agent_id,
+        session_id=session_id,
+        user_id=user_id,
+        status="queued",
+        progress=0,
+        instructions=instructions,
+        document_paths=json.dumps(docs),
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    submit_job(job.id)
+    return job
+
+async def get_job(job_id: str, db: AsyncSession) -> IngestionJob:
+    result = await db.execute(select(IngestionJob).where(IngestionJob.id == job_id))
+    return result.scalars().first()
+
+async def get_active_job(agent_id: str, db: AsyncSession) -> IngestionJob:
+    # The agent's newest queued or running job, if any
+    result = await db.execute(
+        select(IngestionJob)
+        .where(IngestionJob.agent_id == agent_id, IngestionJob.status.in_(ACTIVE_STATES))
+        .order_by(IngestionJob.created_at.desc())
+    )
+    return result.scalars().first()
+
+async def cancel_job(job_id: str, db: AsyncSession) -> IngestionJob:
+    job = await get_job(job_id, db)
+    if job and job.status in ACTIVE_STATES:
+        job.cancel_requested = True
+        if job.status == "queued":
+            # Not picked up yet: the worker will see the final state and skip it
+            job.status = "cancelled"
+            job.finished_at = datetime.utcnow()
+        await db.commit()
+        await db.refresh(job)
+    return job
+
+async def resume_jobs() -> int:
+    # Jobs interrupted by a restart start over from the queue
+    _, Session = setup_async_db()
+    async with Session() as db:
+        result = await db.execute(select(IngestionJob).where(IngestionJob.status.in_(ACTIVE_STATES)))
+        jobs = result.scalars().all()
+        for job in jobs:
+            job.status = "queued"
+            job.progress = 0
+        await db.commit()
+    for job in jobs:
+        submit_job(job.id)
+    if jobs:
+        logger.info(f"Re-queued {len(jobs)} interrupted ingestion jobs")
+    return len(jobs)
+
+def shutdown_ingestion():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    shutdown_loaders()
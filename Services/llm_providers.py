@@ -0,0 +1,149 @@
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from dotenv import load_dotenv
+from typing import Any, Iterator, List, Optional
+import threading
+import logging
+import httpx
+import time
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# groq | ollama | fake
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.4"))
+
+# One connection pool for every agent's LLM calls
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "60"))
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1")
+
+# Local stand-in: echoes the last message back after a fixed delay, so load
+# tests exercise the whole request path without a network service
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "200"))
+FAKE_LLM_TOKEN_MS = float(os.getenv("FAKE_LLM_TOKEN_MS", "5"))
+FAKE_LLM_MAX_TOKENS = int(os.getenv("FAKE_LLM_MAX_TOKENS", "64"))
+
+class EchoChatModel(BaseChatModel):
+    # Deterministic: the reply is "Echo: " plus the first max_tokens words of
+    # the last message. latency_ms is spent before the first token and
+    # token_ms per token, whether or not the call streams.
+    latency_ms: float = 200
+    token_ms: float = 5
+    max_tokens: int = 64
+    streaming: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo"
+
+    def _reply(self, messages: List[BaseMessage]) -> List[str]:
+        words = str(messages[-1].content).split()[:self.max_tokens] if messages else []
+        return ["Echo:"] + [f" {word}" for word in words]
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_ms / 1000)
+        for token in self._reply(messages):
+            if self.token_ms:
+                time.sleep(self.token_ms / 1000)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.streaming:
+            text = "".join(chunk.text for chunk in self._stream(messages, stop, run_manager, **kwargs))
+        else:
+            tokens = self._reply(messages)
+            time.sleep((self.latency_ms + self.token_ms * len(tokens)) / 1000)
+            text = "".join(tokens)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+_http_client = None
+_http_async_client = None
+_clients_lock = threading.Lock()
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=LLM_HTTP_MAX_CONNECTIONS, max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE)
+
+def http_client() -> httpx.Client:
+    global _http_client
+    with _clients_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=_limits(), timeout=LLM_HTTP_TIMEOUT)
+        return _http_client
+
+def http_async_client() -> httpx.AsyncClient:
+    global _http_async_client
+    with _clients_lock:
+        if _http_async_client is None:
+            _http_async_client = httpx.AsyncClient(limits=_limits(), timeout=LLM_HTTP_TIMEOUT)
+        return _http_async_client
+
+async def close_http_clients():
+    global _http_client, _http_async_client
+    with _clients_lock:
+        client, async_client = _http_client, _http_async_client
+        _http_client = _http_async_client = None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
+
+def _groq(streaming: bool) -> BaseChatModel:
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        model=os.getenv("MODEL_NAME"),
+        api_key=os.getenv("GROQ_API_KEY"),
+        temperature=LLM_TEMPERATURE,
+        streaming=streaming,
+        http_client=http_client(),
+        http_async_client=http_async_client(),
+    )
+
+def _ollama(streaming: bool) -> BaseChatModel:
+    # langchain_community's client posts through requests; it keeps no pool
+    # of its own, so this provider is for local development
+    from langchain_community.chat_models import ChatOllama
+    return ChatOllama(base_url=OLLAMA_BASE_URL, model=OLLAMA_MODEL, temperature=LLM_TEMPERATURE)
+
+def _fake(streaming: bool) -> BaseChatModel:
+    return EchoChatModel(
+        latency_ms=FAKE_LLM_LATENCY_MS,
+        token_ms=FAKE_LLM_TOKEN_MS,
+        max_tokens=FAKE_LLM_MAX_TOKENS,
+        streaming=streaming,
+    )
+
+LLM_PROVIDERS = {
+    "groq": _groq,
+    "ollama": _ollama,
+    "fake": _fake,
+}
+
+def register_provider(name: str, factory):
+    # factory(streaming: bool) -> chat model
+    LLM_PROVIDERS[name] = factory
+
+def create_llm(streaming: bool = False, provider: str = None) -> BaseChatModel:
+    provider = provider or LLM_PROVIDER
+    factory = LLM_PROVIDERS.get(provider)
+    if factory is None:
+        raise ValueError(f"Unknown LLM provider '{provider}', expected one of {sorted(LLM_PROVIDERS)}")
+    return factory(streaming)
+
+def llm_stats() -> dict:
+    pool = getattr(getattr(_http_client, "_transport", None), "_pool", None)
+    return {
+        "provider": LLM_PROVIDER,
+        "http_max_connections": LLM_HTTP_MAX_CONNECTIONS,
+        "http_max_keepalive": LLM_HTTP_MAX_KEEPALIVE,
+        "http_open_connections": len(getattr(pool, "connections", [])),
+    }
@@ -0,0 +1,142 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from langchain_core.documents.base import Document
+from collections import deque
+from dotenv import load_dotenv
+from typing import Iterator, List
+import multiprocessing
+import threading
+import logging
+import time
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Parser processes; 0 parses in the calling thread
+LOADER_PROCESSES = int(os.getenv("LOADER_PROCESSES", str(min(4, os.cpu_count() or 1))))
+# PDF pages handed to a parser process per task
+LOADER_PAGES_PER_TASK = int(os.getenv("LOADER_PAGES_PER_TASK", "8"))
+# Parse tasks allowed ahead of the consumer, so a slow embedding stage
+# holds back parsing instead of buffering the whole document
+LOADER_PREFETCH = int(os.getenv("LOADER_PREFETCH", str(max(2, LOADER_PROCESSES * 2))))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn, not fork: the server process runs threads (embedding
+            # encoder, inference pool) that must not be forked mid-flight
+            _executor = ProcessPoolExecutor(
+                max_workers=LOADER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+def shutdown_loaders():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def parse_pdf_pages(path: str, start: int, stop: int) -> List[Document]:
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    total_pages = len(reader.pages)
+    return [
+        Document(
+            page_content=reader.pages[page].extract_text(),
+            metadata={"source": path, "page": page, "total_pages": total_pages},
+        )
+        for page in range(start, min(stop, total_pages))
+    ]
+
+def parse_whole_file(path: str) -> List[Document]:
+    from langchain_community.document_loaders import Docx2txtLoader, TextLoader
+    if path.endswith('.docx') or path.endswith('.doc'):
+        return Docx2txtLoader(path).load()
+    return TextLoader(path).load()
+
+def _parse_tasks(path: str) -> list:
+    if path.endswith('.pdf'):
+        from pypdf import PdfReader
+        total_pages = len(PdfReader(path).pages)
+        return [
+            (parse_pdf_pages, path, start, start + LOADER_PAGES_PER_TASK)
+            for start in range(0, total_pages, LOADER_PAGES_PER_TASK)
+        ]
+    if path.endswith('.docx') or path.endswith('.doc') or path.endswith('.txt'):
+        return [(parse_whole_file, path)]
+    raise ValueError(f"Unsupported file type: {path}")
+
+def iter_pages(path: str) -> Iterator[Document]:
+    # Pages come back in document order while later page ranges are still
+    # being parsed in the pool
+    tasks = _parse_tasks(path)
+    if LOADER_PROCESSES <= 0:
+        for fn, *args in tasks:
+            yield from fn(*args)
+        return
+
+    executor = _get_executor()
+    pending = deque()
+    try:
+        for fn, *args in tasks:
+            pending.append(executor.submit(fn, *args))
+            if len(pending) >= LOADER_PREFETCH:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    except BrokenProcessPool:
+        logger.warning("Document parser pool broke, restarting it")
+        shutdown_loaders()
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+
+class StageTimer:
+    # Accumulates wall time and item counts per pipeline stage
+    def __init__(self):
+        self.seconds = {}
+        self.counts = {}
+
+    def add(self, stage: str, seconds: float, count: int = 0):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.counts[stage] = self.counts.get(stage, 0) + count
+
+    def timed(self, stage: str, iterator: Iterator) -> Iterator:
+        # Charges the time spent producing each item of `iterator` to `stage`
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - started)
+                return
+            self.add(stage, time.perf_counter() - started, len(item) if isinstance(item, list) else 1)
+            yield item
+
+    def report(self) -> dict:
+        return {
+            stage: {"seconds": round(self.seconds[stage], 4), "items": self.counts.get(stage, 0)}
+            for stage in self.seconds
+        }
+
+def iter_chunk_batches(path: str, split, batch_size: int, timer: StageTimer) -> Iterator[List[Document]]:
+    # parse -> split -> batches of chunks, one page in flight at a time
+    batch = []
+    for page in timer.timed("parse", iter_pages(path)):
+        started = time.perf_counter()
+        chunks = split([page])
+        timer.add("split", time.perf_counter() - started, len(chunks))
+        batch.extend(chunks)
+        while len(batch) >= batch_size:
+            yield batch[:batch_size]
+            batch = batch[batch_size:]
+    if batch:
+        yield batch
@@ -0,0 +1,43 @@
+from sqlalchemy import Select, tuple_
+from datetime import datetime
+from typing import List, Optional, Tuple
+import base64
+import json
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+class InvalidCursor(ValueError):
+    pass
+
+# Keyset pagination over (created_at, id), newest first. Cursors are opaque
+# to clients: the key of the last row on the previous page, base64url-encoded.
+# Each page is one index range scan that starts after that key, so reading
+# page 10,000 costs the same as page 1.
+def encode_cursor(created_at: datetime, row_id) -> str:
+    payload = json.dumps({"t": created_at.isoformat(), "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["t"]), str(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Invalid page cursor") from e
+
+def keyset_page(stmt: Select, model, limit: int, cursor: Optional[str]) -> Select:
+    # Fetches one row past the page so split_page can tell if there is more
+    stmt = stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    return stmt
+
+def split_page(rows: List, limit: int) -> Tuple[List, Optional[str]]:
+    # The page, and the cursor for the next (older) one or None on the last
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
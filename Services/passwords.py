@@ -0,0 +1,110 @@
+from fastapi import HTTPException, status
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+from typing import Optional, Tuple
+import asyncio
+import logging
+import time
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# bcrypt cost factor. Hashes made with any other cost are rehashed the next
+# time their owner logs in, so it can be raised (or lowered) at any time.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so these threads hash in parallel; 0 hashes on
+# the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash/verify calls allowed in flight before new ones are turned away
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# Runs bcrypt on a bounded thread pool so a burst of logins or signups
+# queues there instead of stalling every other request on the event loop.
+class PasswordHasher:
+    def __init__(self, context: CryptContext, workers: int, max_pending: int):
+        self.context = context
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._dummy_hash = None
+        self.pending = 0
+        self.hashes = 0
+        self.verifications = 0
+        self.rehashes = 0
+        self.rejected = 0
+        self.seconds_total = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many sign-in attempts in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            if self.workers <= 0:
+                return fn(*args)
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.seconds_total += time.perf_counter() - start
+
+    async def hash(self, password: str) -> str:
+        self.hashes += 1
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: Optional[str]) -> Tuple[bool, Optional[str]]:
+        # Returns (matches, new_hash); new_hash is set when the stored hash
+        # uses another cost factor and should be replaced
+        self.verifications += 1
+        if not hashed:
+            # Unknown user: still spend a verification so response time does
+            # not reveal which usernames exist
+            if self._dummy_hash is None:
+                self._dummy_hash = await self._run(self.context.hash, "dummy-password")
+            await self._run(self.context.verify, password, self._dummy_hash)
+            return False, None
+        matches, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        if new_hash:
+            self.rehashes += 1
+        return matches, new_hash
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        operations = self.hashes + self.verifications
+        return {
+            "rounds": BCRYPT_ROUNDS,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "hashes": self.hashes,
+            "verifications": self.verifications,
+            "rehashes": self.rehashes,
+            "rejected": self.rejected,
+            "avg_ms": self.seconds_total / operations * 1000 if operations else 0.0,
+        }
+
+password_hasher = PasswordHasher(pwd_context, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
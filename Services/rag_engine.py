@@ -0,0 +1,93 @@
+from langchain.chains.conversational_retrieval.base import ConversationalRetrievalChain
+from langchain.chains.conversational_retrieval.prompts import CONDENSE_QUESTION_PROMPT
+from langchain.chains.question_answering import load_qa_chain
+from langchain.chains.llm import LLMChain
+from langchain_core.documents.base import Document
+from langchain_core.messages import get_buffer_string
+from langchain_core.vectorstores import VectorStoreRetriever
+from typing import Optional
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Answers questions against an agent's retriever without keeping any
+# per-conversation state. The LLM clients and the prompt chains built on them
+# are created once and shared by every agent; each agent contributes only a
+# read-only retriever over its resident index (see chains_cache), and each
+# request brings its own question and chat_history. One index can therefore
+# serve any number of concurrent conversations: FAISS searches do not
+# mutate the index, and re-preparation swaps in a new retriever instead of
+# changing the one requests may still be reading.
+class RagEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._llm = None
+        self._combine_docs_chain = None
+        self._question_generator = None
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+
+    def _build(self):
+        # Imported here: agent_management owns the LLM settings and imports
+        # the services that use this engine
+        from Services.agent_management import build_llm
+        with self._lock:
+            if self._combine_docs_chain is None:
+                # Only the answer LLM streams; the question rephrasing step
+                # stays silent so streamed tokens are always part of the answer
+                self._llm = build_llm()
+                self._combine_docs_chain = load_qa_chain(build_llm(streaming=True), chain_type="stuff")
+                self._question_generator = LLMChain(llm=self._llm, prompt=CONDENSE_QUESTION_PROMPT)
+                logger.info("Shared RAG LLM clients created")
+
+    @property
+    def llm(self):
+        # Non-streaming shared client, for helper calls such as summaries
+        if self._llm is None:
+            self._build()
+        return self._llm
+
+    def chain_for(self, retriever: VectorStoreRetriever) -> ConversationalRetrievalChain:
+        # A thin per-request wrapper; nothing in it is built per call but the
+        # wrapper itself
+        if self._combine_docs_chain is None:
+            self._build()
+        return ConversationalRetrievalChain(
+            retriever=retriever,
+            combine_docs_chain=self._combine_docs_chain,
+            question_generator=self._question_generator,
+            return_source_documents=False,
+        )
+
+    def invoke(self, retriever: Optional[VectorStoreRetriever], question: str, chat_history: list = None, config: dict = None) -> dict:
+        # Blocking; run through the inference scheduler
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if retriever is None:
+                # Agent without documents: answer from the LLM alone, with
+                # the conversation so far as its only context
+                if self._combine_docs_chain is None:
+                    self._build()
+                documents = [Document(page_content=get_buffer_string(chat_history))] if chat_history else []
+                result = self._combine_docs_chain.invoke({"input_documents": documents, "question": question}, config)
+                return {"question": question, "answer": result["output_text"]}
+            inputs = {"question": question, "chat_history": chat_history or []}
+            return self.chain_for(retriever).invoke(inputs, config)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "clients_ready": self._combine_docs_chain is not None,
+            "requests": self.requests,
+            "active": self.active,
+            "max_active": self.max_active,
+        }
+
+rag_engine = RagEngine()
@@ -0,0 +1,78 @@
+from collections import OrderedDict, deque
+from fastapi import Request
+from dotenv import load_dotenv
+import threading
+import time
+import math
+import os
+
+load_dotenv()
+
+# Login attempts per client IP, and failed attempts per username, allowed
+# within LOGIN_RATE_WINDOW seconds; 0 disables a limit
+LOGIN_RATE_LIMIT_PER_IP = int(os.getenv("LOGIN_RATE_LIMIT_PER_IP", "30"))
+LOGIN_RATE_LIMIT_PER_USERNAME = int(os.getenv("LOGIN_RATE_LIMIT_PER_USERNAME", "5"))
+LOGIN_RATE_WINDOW = float(os.getenv("LOGIN_RATE_WINDOW", "60"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Only behind a proxy that sets X-Forwarded-For; otherwise clients could
+# pick their own address
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() == "true"
+
+def client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+# Sliding-window counter per key (the timestamps of the last `limit` hits).
+# Keys are LRU-bounded so a spray of addresses cannot grow it without limit.
+class RateLimiter:
+    def __init__(self, limit: int, window: float, max_keys: int):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def retry_after(self, key: str) -> int:
+        # Seconds until `key` may try again; 0 when it is under the limit
+        if self.limit <= 0:
+            return 0
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                return 0
+            self._trim(hits)
+            if len(hits) < self.limit:
+                return 0
+            self.limited += 1
+            return max(1, math.ceil(hits[0] + self.window - time.monotonic()))
+
+    def hit(self, key: str):
+        if self.limit <= 0:
+            return
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque(maxlen=self.limit)
+                while len(self._hits) > self.max_keys:
+                    self._hits.popitem(last=False)
+            self._hits.move_to_end(key)
+            hits.append(time.monotonic())
+
+    def reset(self, key: str):
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def _trim(self, hits: deque):
+        cutoff = time.monotonic() - self.window
+        while hits and hits[0] <= cutoff:
+            hits.popleft()
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "window": self.window, "keys": len(self._hits), "limited": self.limited}
+
+login_ip_limiter = RateLimiter(LOGIN_RATE_LIMIT_PER_IP, LOGIN_RATE_WINDOW, RATE_LIMIT_MAX_KEYS)
+login_username_limiter = RateLimiter(LOGIN_RATE_LIMIT_PER_USERNAME, LOGIN_RATE_WINDOW, RATE_LIMIT_MAX_KEYS)
@@ -0,0 +1,174 @@
+from collections import OrderedDict
+from dotenv import load_dotenv
+from typing import Optional
+from Services.embeddings import get_embedding_service
+import numpy as np
+import threading
+import logging
+import time
+import re
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+# Cosine similarity a paraphrase must reach to reuse a cached answer; 0 turns
+# the semantic tier off
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_question(question: str) -> str:
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", question.lower())).strip()
+
+class _Entry:
+    __slots__ = ("answer", "vector", "created_at")
+
+    def __init__(self, answer: str, vector: Optional[np.ndarray]):
+        self.answer = answer
+        self.vector = vector
+        self.created_at = time.monotonic()
+
+class Lookup:
+    __slots__ = ("answer", "match", "vector")
+
+    def __init__(self, answer: str = None, match: str = None, vector: Optional[np.ndarray] = None):
+        self.answer = answer
+        self.match = match
+        self.vector = vector
+
+# Answers per (agent, document-set version): an exact tier keyed by the
+# normalized question and a semantic tier that compares question
+# embeddings. A new index version or an explicit invalidate() (on
+# re-preparation) makes an agent's old answers unreachable. Only opening
+# questions are cached: with chat history the chain condenses the question
+# against it, so "tell me more" means something different in every
+# conversation.
+class ResponseCache:
+    def __init__(self, embedding, ttl: float, max_entries: int, similarity: float, enabled: bool = True):
+        self.embedding = embedding
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.enabled = enabled
+        self._agents = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bypassed = 0
+        self.invalidations = 0
+
+    def _entries(self, agent_id: str, version: str) -> OrderedDict:
+        # Called with the lock held; a new version drops the old answers
+        current = self._agents.get(agent_id)
+        if current is None or current[0] != version:
+            current = (version, OrderedDict())
+            self._agents[agent_id] = current
+        return current[1]
+
+    def _expire(self, entries: OrderedDict):
+        if self.ttl <= 0:
+            return
+        cutoff = time.monotonic() - self.ttl
+        while entries:
+            key, entry = next(iter(entries.items()))
+            if entry.created_at > cutoff:
+                break
+            del entries[key]
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        if self.similarity <= 0:
+            return None
+        try:
+            vector = np.asarray(self.embedding.embed_query(question), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Response cache could not embed the question: {str(e)}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, agent_id: str, version: str, question: str, chat_history: list = None) -> Lookup:
+        # Blocking (the semantic tier embeds the question); call off the event loop
+        if not self.enabled:
+            return Lookup()
+        if chat_history:
+            with self._lock:
+                self.bypassed += 1
+            return Lookup()
+        key = normalize_question(question)
+        with self._lock:
+            entries = self._entries(agent_id, version)
+            self._expire(entries)
+            entry = entries.get(key)
+            if entry is not None:
+                entries.move_to_end(key)
+                self.exact_hits += 1
+                return Lookup(entry.answer, "exact", entry.vector)
+
+        vector = self._embed(question)
+        if vector is not None:
+            with self._lock:
+                entries = self._entries(agent_id, version)
+                candidates = [(k, e) for k, e in entries.items() if e.vector is not None]
+                if candidates:
+                    scores = np.stack([e.vector for _, e in candidates]) @ vector
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.similarity:
+                        best_key, entry = candidates[best]
+                        entries.move_to_end(best_key)
+                        self.semantic_hits += 1
+                        return Lookup(entry.answer, "semantic", vector)
+        with self._lock:
+            self.misses += 1
+        return Lookup(vector=vector)
+
+    def store(self, agent_id: str, version: str, question: str, answer: str, vector: Optional[np.ndarray] = None, chat_history: list = None):
+        if not self.enabled or not answer or chat_history:
+            return
+        key = normalize_question(question)
+        with self._lock:
+            entries = self._entries(agent_id, version)
+            entries[key] = _Entry(answer, vector)
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self.stores += 1
+
+    def invalidate(self, agent_id: str):
+        with self._lock:
+            if self._agents.pop(agent_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        with self._lock:
+            entries = sum(len(entries) for _, entries in self._agents.values())
+        return {
+            "enabled": self.enabled,
+            "agents": len(self._agents),
+            "entries": entries,
+            "ttl": self.ttl,
+            "similarity_threshold": self.similarity,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "bypassed": self.bypassed,
+            "invalidations": self.invalidations,
+        }
+
+response_cache = ResponseCache(
+    get_embedding_service(),
+    ttl=RESPONSE_CACHE_TTL,
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    similarity=RESPONSE_CACHE_SIMILARITY,
+    enabled=RESPONSE_CACHE_ENABLED,
+)
@@ -1,36 +1,47 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.SessionModels import Session as UserSession
+from Services.pagination import PAGE_SIZE, keyset_page, split_page
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Tuple
 import uuid
 
-def create_session(user_id: int, name: str, db: Session) -> UserSession:
+async def create_session(user_id: int, name: str, db: AsyncSession) -> UserSession:
     new_session = UserSession(id=str(uuid.uuid4()), name=name, user_id=user_id)
     db.add(new_session)
-    db.commit()
-    db.refresh(new_session)
+    await db.commit()
+    await db.refresh(new_session)
     return new_session
 
-def get_active_sessions(user_id: int, db: Session) -> List[UserSession]:
-    return db.query(UserSession).filter(UserSession.user_id == user_id).all()
+async def get_active_sessions(
+    user_id: int,
+    db: AsyncSession,
+    limit: int = PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Tuple[List[UserSession], Optional[str]]:
+    # Newest first, one page at a time
+    stmt = select(UserSession).where(UserSession.user_id == user_id)
+    result = await db.execute(keyset_page(stmt, UserSession, limit, cursor))
+    return split_page(result.scalars().all(), limit)
 
-def get_session_by_id(session_id: str, db: Session) -> UserSession:
-    return db.query(UserSession).filter(UserSession.id == session_id).first()
+async def get_session_by_id(session_id: str, db: AsyncSession) -> UserSession:
+    result = await db.execute(select(UserSession).where(UserSession.id == session_id))
+    return result.scalars().first()
 
-def update_session(session_id: str, name: str, db: Session) -> UserSession:
-    session = db.query(UserSession).filter(UserSession.id == session_id).first()
+async def update_session(session_id: str, name: str, db: AsyncSession) -> UserSession:
+    session = await get_session_by_id(session_id, db)
     if session:
         session.name = name
         session.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(session)
+        await db.commit()
+        await db.refresh(session)
         return session
     return None
 
-def invalidate_session(session_id: str, db: Session) -> bool:
-    session = db.query(UserSession).filter(UserSession.id == session_id).first()
+async def invalidate_session(session_id: str, db: AsyncSession) -> bool:
+    session = await get_session_by_id(session_id, db)
     if session:
-        db.delete(session)
-        db.commit()
+        await db.delete(session)
+        await db.commit()
         return True
-    return False
\ No newline at end of file
+    return False
@@ -0,0 +1,18 @@
+from langchain_core.callbacks import BaseCallbackHandler
+from fastapi.encoders import jsonable_encoder
+import asyncio
+import json
+
+# Forwards LLM tokens produced on an inference worker thread into an
+# asyncio.Queue owned by the request's event loop
+class TokenQueueHandler(BaseCallbackHandler):
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self.loop = loop
+        self.queue = queue
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if token:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, token)
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from models.UserModels import User
+from dotenv import load_dotenv
+import threading
+import time
+import os
+
+load_dotenv()
+
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "true").lower() == "true"
+# Bounds how long another worker process can serve a stale user after an
+# update or delete it did not see
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+# What requests read from the current user. The password hash is never
+# cached, so a User served from here cannot be used to verify a password.
+_COLUMNS = ("id", "Name", "Username", "Email", "isadmin", "isactive")
+
+# Users resolved from JWT subjects, keyed by username. Only the _COLUMNS
+# values are kept; every hit hands out a fresh, session-less User, so a
+# request never sees another request's instance or triggers a lazy load on
+# it. Anything that writes a user row (updates, deletes, password rehashes)
+# invalidates its entry in this process.
+class UserCache:
+    def __init__(self, ttl: float, max_entries: int, enabled: bool = True):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled and ttl > 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, username: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[username]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            values = entry[1]
+        return User(**values)
+
+    def put(self, user: User):
+        if not self.enabled or user is None:
+            return
+        values = {name: getattr(user, name) for name in _COLUMNS}
+        with self._lock:
+            self._entries[user.Username] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user.Username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *usernames: str):
+        with self._lock:
+            for username in usernames:
+                if self._entries.pop(username, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+user_cache = UserCache(USER_CACHE_TTL, USER_CACHE_MAX_ENTRIES, USER_CACHE_ENABLED)
@@ -0,0 +1,160 @@
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents.base import Document
+from Services.ann_index import create_index, configure_search
+from dotenv import load_dotenv
+from typing import Optional
+import numpy as np
+import hashlib
+import logging
+import pickle
+import shutil
+import uuid
+import os
+import faiss
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Each agent gets its own directory of index versions keyed by the content
+# hash of the documents it was built from:
+#   {VECTOR_STORE_DIR}/{agent_id}/{content_hash}/index.faiss|index.pkl
+#   {VECTOR_STORE_DIR}/{agent_id}/CURRENT  -> name of the live version
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "./doc_parser/agents")
+VECTOR_STORE_MMAP = os.getenv("VECTOR_STORE_MMAP", "true").lower() == "true"
+CURRENT_FILE = "CURRENT"
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def content_hash(paths: list) -> str:
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(bytes.fromhex(file_hash(path)))
+    return digest.hexdigest()
+
+def agent_index_dir(agent_id: str) -> str:
+    return os.path.join(VECTOR_STORE_DIR, agent_id)
+
+def _write_atomic(path: str, data: str):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def current_index_hash(agent_id: str) -> Optional[str]:
+    try:
+        with open(os.path.join(agent_index_dir(agent_id), CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def has_index(agent_id: str, digest: str = None) -> bool:
+    current = current_index_hash(agent_id)
+    if current is None or (digest is not None and current != digest):
+        return False
+    return os.path.exists(os.path.join(agent_index_dir(agent_id), current, "index.faiss"))
+
+def save_index(agent_id: str, vectordb: FAISS, digest: str) -> str:
+    base_dir = agent_index_dir(agent_id)
+    os.makedirs(base_dir, exist_ok=True)
+    final_dir = os.path.join(base_dir, digest)
+
+    # Write into a scratch directory, then rename it into place so readers
+    # never observe a half-written index
+    tmp_dir = os.path.join(base_dir, f".tmp-{uuid.uuid4().hex}")
+    vectordb.save_local(tmp_dir)
+    # Rebuilding the same content (e.g. as another index type) replaces the
+    # version in place: the old directory is renamed aside first, so
+    # final_dir is missing only between two renames rather than for a
+    # whole rmtree
+    old_dir = None
+    if os.path.exists(final_dir):
+        old_dir = os.path.join(base_dir, f".old-{uuid.uuid4().hex}")
+        os.replace(final_dir, old_dir)
+    os.replace(tmp_dir, final_dir)
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    _write_atomic(os.path.join(base_dir, CURRENT_FILE), digest)
+
+    for name in os.listdir(base_dir):
+        stale = os.path.join(base_dir, name)
+        if name not in (digest, CURRENT_FILE) and os.path.isdir(stale):
+            shutil.rmtree(stale, ignore_errors=True)
+    logger.info(f"Saved vector index for agent {agent_id} at {final_dir}")
+    return final_dir
+
+def load_index(agent_id: str, embedding, digest: str = None, writable: bool = False) -> Optional[FAISS]:
+    digest = digest or current_index_hash(agent_id)
+    if digest is None:
+        return None
+    index_dir = os.path.join(agent_index_dir(agent_id), digest)
+    if not os.path.exists(os.path.join(index_dir, "index.faiss")):
+        return None
+
+    if writable or not VECTOR_STORE_MMAP:
+        return _load_in_memory(index_dir, embedding)
+
+    # Memory-map the vectors read-only so idle agents' indexes stay on disk
+    # and pages are only faulted in when searched
+    index_path = os.path.join(index_dir, "index.faiss")
+    try:
+        index = faiss.read_index(index_path, _mmap_flags(index_path))
+    except RuntimeError:
+        logger.warning(f"Index for agent {agent_id} cannot be memory-mapped, loading it into memory")
+        return _load_in_memory(index_dir, embedding)
+    with open(os.path.join(index_dir, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    vectordb = FAISS(
+        embedding_function=embedding,
+        index=configure_search(index),
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
+    _record_footprint(vectordb, index_path, mapped=True)
+    return vectordb
+
+def _mmap_flags(index_path: str) -> int:
+    # IO_FLAG_MMAP only maps IVF inverted lists; flat and HNSW storage is
+    # read into memory unless IO_FLAG_MMAP_IFC is given. The two cannot be
+    # combined for IVF, so pick by the index's fourcc ("Iw.." for IVF).
+    with open(index_path, "rb") as f:
+        fourcc = f.read(4)
+    if fourcc.startswith(b"Iw"):
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+def _record_footprint(vectordb: FAISS, index_path: str, mapped: bool):
+    # Read by Services/chain_cache.py: mapped pages are file-backed and can
+    # be reclaimed by the kernel, so they do not count against its budget
+    vectordb.index_bytes = os.path.getsize(index_path)
+    vectordb.index_mapped = mapped
+
+def _load_in_memory(index_dir: str, embedding) -> FAISS:
+    vectordb = FAISS.load_local(index_dir, embedding, allow_dangerous_deserialization=True)
+    configure_search(vectordb.index)
+    _record_footprint(vectordb, os.path.join(index_dir, "index.faiss"), mapped=False)
+    return vectordb
+
+def create_vectorstore(texts: list, vectors: list, metadatas: list, ids: list, embedding, index_type: str) -> FAISS:
+    # Like FAISS.from_embeddings, but on the requested faiss index type
+    index = create_index(np.asarray(vectors, dtype=np.float32), index_type)
+    docstore = InMemoryDocstore({
+        docstore_id: Document(page_content=text, metadata=metadata)
+        for docstore_id, text, metadata in zip(ids, texts, metadatas)
+    })
+    return FAISS(
+        embedding_function=embedding,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+
+def delete_index(agent_id: str):
+    shutil.rmtree(agent_index_dir(agent_id), ignore_errors=True)
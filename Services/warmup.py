@@ -0,0 +1,112 @@
+from sqlalchemy import select, func
+from models.AgentsModels import Agent
+from models.ChatModels import Chat
+from Services.db_config import setup_async_db
+from Services.agent_management import chains_cache, restore_retriever, load_embedding_model
+from Services.vector_store import has_index
+from dotenv import load_dotenv
+from datetime import datetime
+import asyncio
+import logging
+import os
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "2"))
+WARMUP_MAX_AGENTS = int(os.getenv("WARMUP_MAX_AGENTS", "100"))
+
+warmup_state = {
+    "status": "pending",
+    "total": 0,
+    "warmed": 0,
+    "skipped": 0,
+    "failed": 0,
+    "current": [],
+    "started_at": None,
+    "finished_at": None,
+}
+_warmup_task = None
+
+async def agents_to_warm(limit: int):
+    # Agents with documents, most recently chatted first; never-chatted
+    # agents follow, newest first
+    last_chat = (
+        select(Chat.agent_id, func.max(Chat.created_at).label("last_chat_at"))
+        .group_by(Chat.agent_id)
+        .subquery()
+    )
+    stmt = (
+        select(Agent.id)
+        .outerjoin(last_chat, last_chat.c.agent_id == Agent.id)
+        .where(Agent.document_paths.isnot(None))
+        .order_by(last_chat.c.last_chat_at.desc().nulls_last(), Agent.updated_at.desc())
+        .limit(limit)
+    )
+    _, Session = setup_async_db()
+    async with Session() as db:
+        result = await db.execute(stmt)
+        return [row[0] for row in result.all()]
+
+async def warm_agents():
+    warmup_state.update(status="warming", started_at=datetime.utcnow(), finished_at=None)
+    try:
+        candidates = await agents_to_warm(WARMUP_MAX_AGENTS)
+        agent_ids = [agent_id for agent_id in candidates if has_index(agent_id)]
+        warmup_state["total"] = len(candidates)
+        warmup_state["skipped"] = len(candidates) - len(agent_ids)
+        logger.info(f"Warming up {len(agent_ids)} agents with persisted indexes")
+        embedding = await asyncio.to_thread(load_embedding_model) if agent_ids else None
+
+        queue = asyncio.Queue()
+        for agent_id in agent_ids:
+            queue.put_nowait(agent_id)
+
+        async def worker():
+            while not queue.empty():
+                agent_id = queue.get_nowait()
+                if agent_id in chains_cache:
+                    warmup_state["skipped"] += 1
+                    continue
+                warmup_state["current"].append(agent_id)
+                try:
+                    retriever = await asyncio.to_thread(restore_retriever, agent_id, embedding)
+                    if retriever is None:
+                        warmup_state["skipped"] += 1
+                    elif agent_id not in chains_cache:
+                        chains_cache[agent_id] = retriever
+                        warmup_state["warmed"] += 1
+                except Exception as e:
+                    warmup_state["failed"] += 1
+                    logger.error(f"Warm-up failed for agent {agent_id}: {str(e)}")
+                finally:
+                    warmup_state["current"].remove(agent_id)
+
+        await asyncio.gather(*(worker() for _ in range(WARMUP_CONCURRENCY)))
+        warmup_state["status"] = "ready"
+    except Exception as e:
+        warmup_state["status"] = "failed"
+        logger.error(f"Warm-up aborted: {str(e)}", exc_info=True)
+    finally:
+        warmup_state["finished_at"] = datetime.utcnow()
+        logger.info(f"Warm-up finished: {warmup_state}")
+
+def start_warmup():
+    global _warmup_task
+    if not WARMUP_ENABLED:
+        warmup_state["status"] = "ready"
+        return None
+    _warmup_task = asyncio.create_task(warm_agents())
+    return _warmup_task
+
+async def stop_warmup():
+    if _warmup_task is not None and not _warmup_task.done():
+        _warmup_task.cancel()
+        try:
+            await _warmup_task
+        except asyncio.CancelledError:
+            pass
+
+def is_ready() -> bool:
+    return warmup_state["status"] in ("ready", "failed")
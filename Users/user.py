@@ -2,12 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request, Form, st
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession as Session
 from datetime import timedelta
 from schemas.UserSchemas import UserLogin, UserCreate, UserUpdate, UserResponse, UserRegisterResponse
 from schemas.SessionSchemas import SessionCreate, SessionUpdate, SessionResponse
 from Services.auth import create_access_token, get_current_user, create_user, authenticate_user, update_user, delete_user, get_user_by_username, get_password_hash, ACCESS_TOKEN_EXPIRE_MINUTES
 from Services.db_config import get_db
+from Services.rate_limit import client_ip, login_ip_limiter, login_username_limiter
 from Services.session_management import create_session, get_active_sessions, update_session, invalidate_session
 
 user_routes = APIRouter(tags=['Users'])
@@ -21,9 +22,23 @@ def login_page(request: Request):
 
 @user_routes.post("/login", response_class=HTMLResponse, name="login")
 async def login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
-    user = authenticate_user(username, password, db)
+    # Every attempt counts against the client address; only failures count
+    # against the username, so its owner is not locked out by succeeding
+    ip = client_ip(request)
+    retry_after = max(login_ip_limiter.retry_after(ip), login_username_limiter.retry_after(username))
+    if retry_after:
+        return templates.TemplateResponse(
+            "login.html",
+            {"request": request, "error": f"Too many sign-in attempts. Kindly try again in {retry_after} seconds."},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(retry_after)},
+        )
+    login_ip_limiter.hit(ip)
+    user = await authenticate_user(username, password, db)
     if not user:
+        login_username_limiter.hit(username)
         return templates.TemplateResponse("login.html", {"request": request, "error": "Email or Password is Incorrect. Kindly try again or if you are a new user kindly signup yourself."})
+    login_username_limiter.reset(username)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.Username}, expires_delta=access_token_expires
@@ -38,7 +53,18 @@ def signup_page(request: Request):
 
 @user_routes.post("/signup", response_class=HTMLResponse, name="signup")
 async def signup(request: Request, name: str = Form(...), username: str = Form(...), email: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
-    if get_user_by_username(username, db):
+    # Signups hash a password too, so they share the per-address budget
+    ip = client_ip(request)
+    retry_after = login_ip_limiter.retry_after(ip)
+    if retry_after:
+        return templates.TemplateResponse(
+            "signup.html",
+            {"request": request, "error": f"Too many attempts. Kindly try again in {retry_after} seconds."},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(retry_after)},
+        )
+    login_ip_limiter.hit(ip)
+    if await get_user_by_username(username, db):
         return templates.TemplateResponse("signup.html", {"request": request, "error": "User already exists"})
     
     user_data = {
@@ -50,7 +76,7 @@ async def signup(request: Request, name: str = Form(...), username: str = Form(.
         "isactive": True
     }
     
-    db_user = create_user(user_data, db)
+    db_user = await create_user(user_data, db)
     
     response_user = UserResponse(
         id=db_user.id,
@@ -72,9 +98,9 @@ async def update_user_route(user_id: int, user: UserUpdate, db: Session = Depend
         raise HTTPException(status_code=403, detail="You do not have permission to update this user")
     
     if user.Password:
-        user.Password = get_password_hash(user.Password)
+        user.Password = await get_password_hash(user.Password)
     
-    db_user = update_user(user_id, user.dict(), db)
+    db_user = await update_user(user_id, user.dict(), db)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
@@ -83,7 +109,7 @@ async def update_user_route(user_id: int, user: UserUpdate, db: Session = Depend
 async def delete_user_route(user_id: int, db: Session = Depends(get_db), current_user: UserResponse = Depends(get_current_user)):
     if not current_user.isadmin:
         raise HTTPException(status_code=403, detail="You do not have permission to delete a user")
-    result = delete_user(user_id, db)
+    result = await delete_user(user_id, db)
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
     return result
@@ -0,0 +1,31 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_agent_documents'
+down_revision = 'add_ingestion_job_stats'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'agent_documents',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('agent_id', sa.String(), sa.ForeignKey('agents.id'), nullable=False),
+        sa.Column('file_hash', sa.String(), nullable=False),
+        sa.Column('path', sa.Text(), nullable=False),
+        sa.Column('filename', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('chunks', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('agent_id', 'file_hash', name='uq_agent_documents_agent_file'),
+    )
+    op.create_index('ix_agent_documents_id', 'agent_documents', ['id'])
+    op.create_index('ix_agent_documents_agent_id', 'agent_documents', ['agent_id'])
+
+def downgrade():
+    op.drop_index('ix_agent_documents_agent_id', table_name='agent_documents')
+    op.drop_index('ix_agent_documents_id', table_name='agent_documents')
+    op.drop_table('agent_documents')
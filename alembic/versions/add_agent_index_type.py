@@ -0,0 +1,14 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_agent_index_type'
+down_revision = 'add_agent_documents'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('agents', sa.Column('index_type', sa.String(), nullable=True))
+
+def downgrade():
+    op.drop_column('agents', 'index_type')
@@ -0,0 +1,15 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_chat_history_indexes'
+down_revision = 'add_agent_index_type'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_chats_agent_user_created', 'chats', ['agent_id', 'user_id', 'created_at', 'id'])
+    op.create_index('ix_chats_session_id', 'chats', ['session_id'])
+
+def downgrade():
+    op.drop_index('ix_chats_session_id', table_name='chats')
+    op.drop_index('ix_chats_agent_user_created', table_name='chats')
@@ -0,0 +1,14 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_ingestion_job_stats'
+down_revision = 'add_ingestion_jobs'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('ingestion_jobs', sa.Column('stats', sa.Text(), nullable=True))
+
+def downgrade():
+    op.drop_column('ingestion_jobs', 'stats')
@@ -0,0 +1,36 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_ingestion_jobs'
+down_revision = 'xxxx'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'ingestion_jobs',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('agent_id', sa.String(), sa.ForeignKey('agents.id'), nullable=False),
+        sa.Column('session_id', sa.String(), sa.ForeignKey('sessions.id'), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('progress', sa.Integer(), nullable=False),
+        sa.Column('document_paths', sa.Text(), nullable=True),
+        sa.Column('instructions', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('cancel_requested', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_ingestion_jobs_id', 'ingestion_jobs', ['id'])
+    op.create_index('ix_ingestion_jobs_agent_id', 'ingestion_jobs', ['agent_id'])
+    op.create_index('ix_ingestion_jobs_status', 'ingestion_jobs', ['status'])
+
+def downgrade():
+    op.drop_index('ix_ingestion_jobs_status', table_name='ingestion_jobs')
+    op.drop_index('ix_ingestion_jobs_agent_id', table_name='ingestion_jobs')
+    op.drop_index('ix_ingestion_jobs_id', table_name='ingestion_jobs')
+    op.drop_table('ingestion_jobs')
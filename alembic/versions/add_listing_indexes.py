@@ -0,0 +1,15 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_listing_indexes'
+down_revision = 'add_chat_history_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_sessions_user_created', 'sessions', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_agents_session_created', 'agents', ['session_id', 'created_at', 'id'])
+
+def downgrade():
+    op.drop_index('ix_agents_session_created', table_name='agents')
+    op.drop_index('ix_sessions_user_created', table_name='sessions')
@@ -0,0 +1,81 @@
+"""Recall@k versus query latency for the agent index types (flat, HNSW,
+IVF-PQ) against exact flat search, over a clustered synthetic corpus the
+shape of MiniLM embeddings. Sweeps efSearch for HNSW and nprobe for IVF-PQ.
+
+    python -m benchmarks.bench_ann --vectors 20000 --dim 384 --queries 300
+"""
+import argparse
+import time
+
+import benchmarks.common  # noqa: F401  (path setup)
+
+import faiss
+import numpy as np
+
+from Services import ann_index
+from benchmarks.common import summarize
+
+def synthetic_corpus(count: int, dimension: int, clusters: int = 200, latent: int = 32, seed: int = 42) -> np.ndarray:
+    # Sentence embeddings have a low intrinsic dimension: draw clustered
+    # points in a small latent space and project them up, plus a little noise
+    rng = np.random.default_rng(42)
+    centers = rng.normal(size=(clusters, latent)).astype(np.float32)
+    projection = rng.normal(size=(latent, dimension)).astype(np.float32)
+    rng = np.random.default_rng(seed)
+    points = centers[rng.integers(clusters, size=count)] + 0.5 * rng.normal(size=(count, latent)).astype(np.float32)
+    vectors = points @ projection + 0.1 * rng.normal(size=(count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(row) & set(expected)) / k for row, expected in zip(found, truth)]))
+
+def measure(label: str, index, queries: np.ndarray, truth: np.ndarray, k: int):
+    latencies = []
+    found = []
+    for query in queries:
+        started = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+        found.append(ids[0])
+    stats = summarize(latencies)
+    print(f"{label:<24} recall@{k} {recall(np.array(found), truth):.3f}  "
+          f"p50 {stats['p50_ms']:.3f}ms  p95 {stats['p95_ms']:.3f}ms  p99 {stats['p99_ms']:.3f}ms")
+
+def build(index_type: str, vectors: np.ndarray):
+    started = time.perf_counter()
+    index = ann_index.create_index(vectors, index_type)
+    print(f"-- {index_type}: built in {time.perf_counter() - started:.2f}s")
+    return index
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("-k", type=int, default=4, help="retriever default is 4")
+    parser.add_argument("--threads", type=int, default=1, help="faiss OpenMP threads; 1 matches one request")
+    args = parser.parse_args()
+    faiss.omp_set_num_threads(args.threads)
+
+    vectors = synthetic_corpus(args.vectors, args.dim)
+    queries = synthetic_corpus(args.queries, args.dim, seed=7)
+    print(f"auto selection for {args.vectors} vectors: {ann_index.select_index_type(args.vectors)}")
+
+    flat = build("flat", vectors)
+    _, truth = flat.search(queries, args.k)
+    measure("flat (exact)", flat, queries, truth, args.k)
+
+    hnsw = build("hnsw", vectors)
+    for ef_search in (16, 32, 64, 128, 256):
+        hnsw.hnsw.efSearch = ef_search
+        measure(f"hnsw efSearch={ef_search}", hnsw, queries, truth, args.k)
+
+    if args.vectors >= ann_index._min_ivfpq_vectors():
+        ivfpq = build("ivfpq", vectors)
+        for nprobe in (1, 4, 16, 64):
+            ivfpq.nprobe = nprobe
+            measure(f"ivfpq nprobe={nprobe}", ivfpq, queries, truth, args.k)
+
+if __name__ == "__main__":
+    main()
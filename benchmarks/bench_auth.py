@@ -0,0 +1,77 @@
+"""Authenticated page latency with and without the in-process user cache:
+requests/sec, p50/p95 and SQL statements per request on GET /playground
+(any authenticated GET works via --path).
+
+    python -m benchmarks.bench_auth --requests 1000 --concurrency 20
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import seed_user, client_for, summarize
+
+from sqlalchemy import event
+
+from main import app
+from Services.db_config import setup_async_db
+from Services.session_management import create_session
+from Services.user_cache import user_cache
+
+async def run(label: str, token: str, path: str, total: int, concurrency: int):
+    engine, _ = setup_async_db()
+    statements = {"count": 0}
+
+    def count(*args):
+        statements["count"] += 1
+
+    samples = []
+    async with client_for(app, token) as client:
+        queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                samples.append(time.perf_counter() - start)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", count)
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    stats = summarize(samples)
+    print(
+        f"{label:<9} {total / elapsed:7.1f} req/s  p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms  "
+        f"{statements['count'] / total:.2f} queries/request"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="/playground")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=10)
+    args = parser.parse_args()
+
+    async def scenario():
+        user, token = await seed_user()
+        _, Session = setup_async_db()
+        async with Session() as db:
+            for i in range(args.sessions):
+                await create_session(user.id, f"session-{i}", db)
+
+        user_cache.enabled = False
+        await run("uncached", token, args.path, args.requests, args.concurrency)
+        user_cache.enabled = True
+        await run("cached", token, args.path, args.requests, args.concurrency)
+        print(f"user cache {user_cache.stats()}")
+
+    asyncio.run(scenario())
+
+if __name__ == "__main__":
+    main()
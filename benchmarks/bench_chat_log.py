@@ -0,0 +1,92 @@
+"""Chat turns/sec and per-turn write latency with the chat log in sync mode
+(commit per turn before answering) versus batched write-behind, plus a
+backpressure run against a deliberately small queue.
+
+    python -m benchmarks.bench_chat_log --turns 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import seed_user, summarize
+
+from sqlalchemy import select, func
+
+from models.AgentsModels import Agent
+from models.ChatModels import Chat
+from Services.chat_log import ChatLog, CHAT_LOG_BATCH_SIZE, CHAT_LOG_FLUSH_INTERVAL_MS, CHAT_LOG_PUT_TIMEOUT
+from Services.db_config import setup_async_db
+from Services.session_management import create_session
+
+async def seed():
+    user, _ = await seed_user()
+    _, Session = setup_async_db()
+    async with Session() as db:
+        session = await create_session(user.id, "chat-log", db)
+        agent = Agent(name="chat-log", session_id=session.id, user_id=user.id)
+        db.add(agent)
+        await db.commit()
+    return user.id, session.id, agent.id
+
+async def count_chats() -> int:
+    _, Session = setup_async_db()
+    async with Session() as db:
+        return (await db.execute(select(func.count(Chat.id)))).scalar()
+
+async def run(label: str, log: ChatLog, ids: tuple, total: int, concurrency: int):
+    user_id, session_id, agent_id = ids
+    before = await count_chats()
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+    samples, outcomes = [], {}
+
+    async def worker():
+        _, Session = setup_async_db()
+        while not queue.empty():
+            i = queue.get_nowait()
+            chat = Chat(session_id=session_id, agent_id=agent_id, user_id=user_id, message=f"question {i}", response=f"answer {i}")
+            start = time.perf_counter()
+            try:
+                # As chat_with_agent does: the request's own session in sync mode
+                async with Session() as db:
+                    await log.record(chat, db)
+                outcome = "ok"
+            except Exception as e:
+                outcome = type(e).__name__
+            samples.append(time.perf_counter() - start)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    answered = time.perf_counter() - start
+    await log.close()
+    durable = time.perf_counter() - start
+    stored = await count_chats() - before
+
+    stats = summarize(samples)
+    print(
+        f"{label:<12} {total / answered:8.1f} turns/s answered, {total / durable:8.1f} turns/s durable  "
+        f"p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms  stored={stored} {outcomes}"
+    )
+    print(f"{'':<12} {log.stats()}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=CHAT_LOG_BATCH_SIZE)
+    parser.add_argument("--flush-interval-ms", type=float, default=CHAT_LOG_FLUSH_INTERVAL_MS)
+    parser.add_argument("--small-queue", type=int, default=16, help="max pending turns for the backpressure run")
+    args = parser.parse_args()
+
+    async def scenario():
+        ids = await seed()
+        await run("sync", ChatLog("sync", args.batch_size, args.flush_interval_ms, 1, CHAT_LOG_PUT_TIMEOUT), ids, args.turns, args.concurrency)
+        await run("batched", ChatLog("batched", args.batch_size, args.flush_interval_ms, args.turns, CHAT_LOG_PUT_TIMEOUT), ids, args.turns, args.concurrency)
+        await run("backpressure", ChatLog("batched", args.batch_size, args.flush_interval_ms, args.small_queue, CHAT_LOG_PUT_TIMEOUT), ids, args.turns, args.concurrency)
+
+    asyncio.run(scenario())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Latency of a cheap endpoint (GET /sessions/user_sessions) while chat
+requests are in flight. Chats go to an agent without documents, answered
+by the fake LLM provider after --chain-latency seconds, like a remote LLM
+call.
+
+    python -m benchmarks.bench_concurrency --chats 8 --probes 200
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import seed_user, client_for, summarize
+
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+from main import app
+from schemas.AgentSchemas import AgentCreate
+from Services.db_config import setup_async_db
+from Services.session_management import create_session
+from Services.agent_management import create_agent
+from Services.llm_providers import EchoChatModel, register_provider
+
+async def probe(client, count: int, interval: float) -> list:
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get("/sessions/user_sessions")
+        response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return samples
+
+async def chat_load(client, url: str, stop: asyncio.Event):
+    while not stop.is_set():
+        await client.post(url, json={"message": "hello"})
+
+async def scenario(args):
+    # An admin, so the run can read /metrics
+    user, token = await seed_user(isadmin=True)
+    _, Session = setup_async_db()
+    async with Session() as db:
+        session = await create_session(user.id, "bench", db)
+        agent = await create_agent(AgentCreate(name="bench", session_id=session.id, user_id=user.id), db)
+    register_provider("fake", lambda streaming: EchoChatModel(latency_ms=args.chain_latency * 1000, token_ms=0, streaming=streaming))
+    chat_url = f"/sessions/{session.id}/agents/{agent.id}/chat"
+
+    async with client_for(app, token) as client:
+        idle = await probe(client, args.probes, args.interval)
+
+        stop = asyncio.Event()
+        chats = [asyncio.create_task(chat_load(client, chat_url, stop)) for _ in range(args.chats)]
+        loaded = await probe(client, args.probes, args.interval)
+        stop.set()
+        await asyncio.gather(*chats)
+        metrics = (await client.get("/metrics")).json()
+
+
+    for label, samples in (("idle", idle), ("under chat", loaded)):
+        stats = summarize(samples)
+        print(f"{label:<11} p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms")
+    print(f"inference   {metrics['inference']}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=8, help="concurrent chat clients")
+    parser.add_argument("--chain-latency", type=float, default=0.5)
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(scenario(args))
+
+if __name__ == "__main__":
+    main()
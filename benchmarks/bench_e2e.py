@@ -0,0 +1,235 @@
+"""End-to-end load test of the chat path through the real app in main.py:
+login -> session create -> agent create -> prepare (upload a synthetic
+corpus and wait for the ingestion job) -> concurrent chats. The LLM is
+the local fake provider and, by default, a hashing embedder stands in for
+the sentence-transformers model, so the run needs no network.
+
+Per stage it reports throughput, p50/p95/p99 latency and process RSS, and
+writes everything to JSON so runs on different commits can be compared:
+
+    python -m benchmarks.bench_e2e --users 8 --chats 400 --concurrency 32
+    python -m benchmarks.bench_e2e --compare benchmarks/results/e2e-<commit>.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import time
+from datetime import datetime
+
+from benchmarks.common import BENCH_DIR, seed_user, client_for, summarize, rss_bytes
+from benchmarks.bench_embeddings import WORDS
+from benchmarks.hash_embeddings import HashEmbeddings
+
+logging.getLogger("Services").setLevel(logging.WARNING)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def run_stage(name: str, count: int, concurrency: int, op) -> dict:
+    # Runs op(i) for i in range(count) on `concurrency` workers
+    samples, errors = [], []
+    rss_before = rss_bytes()
+    queue = asyncio.Queue()
+    for i in range(count):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                await op(i)
+                samples.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, count)))))
+    seconds = time.perf_counter() - start
+    rss_after = rss_bytes()
+    result = {
+        **summarize(samples),
+        "errors": len(errors),
+        "seconds": seconds,
+        "throughput_per_s": len(samples) / seconds if seconds else 0.0,
+        "rss_mb": rss_after / 2 ** 20,
+        "rss_delta_mb": (rss_after - rss_before) / 2 ** 20,
+    }
+    print(
+        f"{name:<14} n={result['count']:<5} err={result['errors']:<3} {result['throughput_per_s']:8.1f}/s  "
+        f"p50={result['p50_ms']:8.1f}ms p95={result['p95_ms']:8.1f}ms p99={result['p99_ms']:8.1f}ms  "
+        f"rss={result['rss_mb']:.0f}MB ({result['rss_delta_mb']:+.0f})"
+    )
+    if errors:
+        print(f"{'':<14} first error: {errors[0]}")
+    return result
+
+def write_corpus(count: int, chunks: int) -> list:
+    corpus_dir = os.path.join(BENCH_DIR, "corpus")
+    os.makedirs(corpus_dir, exist_ok=True)
+    paths = []
+    for i in range(count):
+        # Distinct text per document, so neither the document registry nor
+        # the embedding cache turns preparation into a cache hit
+        rng = random.Random(i)
+        paragraphs = [" ".join(rng.choice(WORDS) for _ in range(150)) + f" {i}-{n}" for n in range(chunks)]
+        path = os.path.join(corpus_dir, f"doc-{i}.txt")
+        with open(path, "w") as f:
+            f.write("\n\n".join(paragraphs))
+        paths.append(path)
+    return paths
+
+async def scenario(args) -> dict:
+    from main import app
+    from Services.embeddings import embedding_service
+    from Services.llm_providers import EchoChatModel, register_provider
+
+    register_provider("fake", lambda streaming: EchoChatModel(
+        latency_ms=args.llm_latency_ms, token_ms=args.llm_token_ms, max_tokens=args.llm_tokens, streaming=streaming,
+    ))
+    if args.embedder == "hash":
+        embedding_service._model = HashEmbeddings(args.dim)
+
+    password = "bench-password"
+    users = []
+    for i in range(args.users):
+        # The first user is an admin, so the run can read /metrics
+        user, _ = await seed_user(f"bench{i}", password, isadmin=i == 0)
+        users.append({"id": user.id, "username": user.Username, "client": client_for(app)})
+    corpus = write_corpus(args.users, args.doc_chunks)
+    stages = {"startup": {"rss_mb": rss_bytes() / 2 ** 20}}
+
+    async def login(i):
+        user = users[i]
+        response = await user["client"].post("/login", data={"username": user["username"], "password": password})
+        if response.status_code != 302 or "access_token" not in user["client"].cookies:
+            raise RuntimeError(f"login failed with {response.status_code}")
+
+    async def create_session(i):
+        response = await users[i]["client"].post("/sessions/create", json={"name": f"bench session {i}"})
+        response.raise_for_status()
+        users[i]["session_id"] = response.json()["id"]
+
+    async def create_agent(i):
+        user = users[i]
+        response = await user["client"].post(
+            f"/sessions/{user['session_id']}/agents",
+            json={"name": f"bench agent {i}", "session_id": user["session_id"], "user_id": user["id"]},
+        )
+        response.raise_for_status()
+        user["agent_id"] = response.json()["id"]
+
+    async def prepare(i):
+        user = users[i]
+        base = f"/sessions/{user['session_id']}/agents/{user['agent_id']}"
+        with open(corpus[i], "rb") as f:
+            response = await user["client"].post(
+                f"{base}/prepare",
+                data={"instructions": "Answer from the documents."},
+                files={"pdf_file": (os.path.basename(corpus[i]), f, "text/plain")},
+            )
+        response.raise_for_status()
+        job = response.json()
+        while job["status"] not in ("ready", "failed", "cancelled"):
+            await asyncio.sleep(0.05)
+            job = (await user["client"].get(f"{base}/prepare/{job['id']}")).json()
+        if job["status"] != "ready":
+            raise RuntimeError(f"preparation {job['status']}: {job.get('error')}")
+
+    async def chat(i):
+        user = users[i % len(users)]
+        url = f"/sessions/{user['session_id']}/agents/{user['agent_id']}/chat"
+        response = await user["client"].post(url, json={"message": f"question {i}: what does chunk {i % 50} say about retrieval"})
+        response.raise_for_status()
+
+    ttft = []
+
+    async def chat_stream(i):
+        user = users[i % len(users)]
+        url = f"/sessions/{user['session_id']}/agents/{user['agent_id']}/chat/stream"
+        start = time.perf_counter()
+        first = None
+        async with user["client"].stream("POST", url, json={"message": f"streamed question {i} about index {i % 50}"}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if first is None and line.startswith("event: token"):
+                    first = time.perf_counter() - start
+                    ttft.append(first)
+                if line.startswith("event: error"):
+                    raise RuntimeError("stream reported an error")
+
+    stages["login"] = await run_stage("login", args.users, args.users, login)
+    stages["session_create"] = await run_stage("session_create", args.users, args.users, create_session)
+    stages["agent_create"] = await run_stage("agent_create", args.users, args.users, create_agent)
+    stages["prepare"] = await run_stage("prepare", args.users, args.users, prepare)
+    stages["chat"] = await run_stage("chat", args.chats, args.concurrency, chat)
+    if args.stream_chats:
+        stages["chat_stream"] = await run_stage("chat_stream", args.stream_chats, args.concurrency, chat_stream)
+        stages["chat_stream"]["ttft"] = summarize(ttft)
+
+    metrics = (await users[0]["client"].get("/metrics")).json()
+    for user in users:
+        await user["client"].aclose()
+    return {"stages": stages, "metrics": metrics}
+
+def compare(current: dict, baseline: dict):
+    print(f"\nversus {baseline['commit']} ({baseline['timestamp']})")
+    for name, stage in current["stages"].items():
+        before = baseline["stages"].get(name)
+        if not before or "p95_ms" not in stage:
+            continue
+        throughput = (stage["throughput_per_s"] / before["throughput_per_s"] - 1) * 100 if before["throughput_per_s"] else 0.0
+        p95 = (stage["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        rss = stage["rss_mb"] - before["rss_mb"]
+        print(f"{name:<14} throughput {throughput:+6.1f}%  p95 {p95:+6.1f}%  rss {rss:+.0f}MB")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=4, help="users, each with one session, agent and document")
+    parser.add_argument("--doc-chunks", type=int, default=200, help="synthetic chunks per document")
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--stream-chats", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--llm-token-ms", type=float, default=2)
+    parser.add_argument("--llm-tokens", type=int, default=32)
+    parser.add_argument("--embedder", choices=("hash", "model"), default="hash")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--response-cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--output", help="result file (default benchmarks/results/e2e-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to diff against")
+    args = parser.parse_args()
+
+    # Read by the app's modules on import, so set before main is imported
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "true" if args.response_cache else "false"
+    os.environ.setdefault("WARMUP_ENABLED", "false")
+
+    commit = git_commit()
+    result = {
+        "commit": commit,
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": vars(args),
+        **asyncio.run(scenario(args)),
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"e2e-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2, default=str)
+    print(f"\nresults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Cache-hit preparation time: the old CacheBackedEmbeddings over a
+LocalFileStore (one JSON file per vector) versus the packed SQLite
+EmbeddingCache. A fixed-vector embedder stands in for the model so only
+cache cost is measured (so "cold" is mostly the cost of writing the cache).
+
+    python -m benchmarks.bench_embedding_cache --chunks 5000 --dim 384
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import benchmarks.common  # noqa: F401  (path setup)
+
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
+from langchain_core.embeddings import Embeddings
+from Services.embedding_cache import EmbeddingCache, CachedEmbeddings, migrate_local_file_store
+from benchmarks.bench_embeddings import synthetic_chunks
+
+NAMESPACE = "sentence-transformers/all-MiniLM-L6-v2"
+
+class FixedEmbeddings(Embeddings):
+    def __init__(self, dim: int):
+        self.vector = [0.001 * i for i in range(dim)]
+
+    def embed_documents(self, texts):
+        return [self.vector for _ in texts]
+
+    def embed_query(self, text):
+        return self.vector
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def report(label: str, cold: float, warm: float, chunks: int, footprint: str):
+    print(f"{label:<16} cold {cold:.3f}s  hit {warm:.3f}s ({chunks / warm:.0f} chunks/s)  {footprint}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+    # Distinct texts; the synthetic generator repeats with small vocabularies
+    chunks = [f"{i} {text}" for i, text in enumerate(synthetic_chunks(args.chunks, words=40))]
+    model = FixedEmbeddings(args.dim)
+    root = tempfile.mkdtemp()
+
+    file_root = os.path.join(root, "files")
+    files = CacheBackedEmbeddings.from_bytes_store(model, LocalFileStore(file_root), namespace=NAMESPACE)
+    cold = timed(lambda: files.embed_documents(chunks))
+    warm = timed(lambda: files.embed_documents(chunks))
+    count = sum(len(names) for _, _, names in os.walk(file_root))
+    report("LocalFileStore", cold, warm, len(chunks), f"{count} files")
+
+    cache = EmbeddingCache(os.path.join(root, "packed.sqlite3"), max_bytes=1 << 34)
+    packed = CachedEmbeddings(model, cache, namespace=NAMESPACE)
+    cold = timed(lambda: packed.embed_documents(chunks))
+    warm = timed(lambda: packed.embed_documents(chunks))
+    report("packed sqlite", cold, warm, len(chunks), f"1 file, {os.path.getsize(cache.path)} bytes")
+
+    migrated_cache = EmbeddingCache(os.path.join(root, "migrated.sqlite3"), max_bytes=1 << 34)
+    elapsed = timed(lambda: migrate_local_file_store(file_root, migrated_cache, "sentence-transformers"))
+    migrated = CachedEmbeddings(model, migrated_cache, namespace=NAMESPACE)
+    migrated.embed_documents(chunks)
+    print(f"migration        {len(migrated_cache)} vectors in {elapsed:.3f}s, hit rate afterwards {migrated_cache.stats()['hit_rate']:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Chunks/sec for agent preparation embedding: a fresh HuggingFaceEmbeddings
+per preparation (cold, the old behaviour) versus the shared EmbeddingService
+(warm), sequentially and with concurrent preparations coalescing batches.
+
+    python -m benchmarks.bench_embeddings --chunks 500 --preparations 4
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import benchmarks.common  # noqa: F401  (path setup)
+
+from langchain_huggingface import HuggingFaceEmbeddings
+from Services.embeddings import embedding_service, EMBEDDING_MODEL_NAME
+
+WORDS = "agent session retrieval vector index document chunk model answer question context memory".split()
+
+def synthetic_chunks(count: int, words: int = 150) -> list:
+    rng = random.Random(42)
+    return [" ".join(rng.choice(WORDS) for _ in range(words)) for _ in range(count)]
+
+def cold_preparation(chunks: list):
+    HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME).embed_documents(chunks)
+
+def warm_preparation(chunks: list):
+    embedding_service.embed_documents(chunks)
+
+def measure(label: str, fn, chunks: list, preparations: int, workers: int):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda _: fn(chunks), range(preparations)))
+    elapsed = time.perf_counter() - start
+    total = len(chunks) * preparations
+    print(f"{label:<22} {total} chunks in {elapsed:.2f}s -> {total / elapsed:.1f} chunks/s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=500, help="chunks per preparation")
+    parser.add_argument("--preparations", type=int, default=4)
+    args = parser.parse_args()
+    chunks = synthetic_chunks(args.chunks)
+
+    measure("cold sequential", cold_preparation, chunks, args.preparations, 1)
+    embedding_service.embed_query("load the shared model")
+    measure("warm sequential", warm_preparation, chunks, args.preparations, 1)
+    measure("cold concurrent", cold_preparation, chunks, args.preparations, args.preparations)
+    measure("warm concurrent", warm_preparation, chunks, args.preparations, args.preparations)
+    print(embedding_service.stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Latency of a cheap authenticated endpoint (GET /sessions/user_sessions)
+while a storm of concurrent logins runs, with bcrypt on the event loop (the
+old behaviour) versus on the bounded hashing pool.
+
+    python -m benchmarks.bench_login_storm --logins 200 --concurrency 32
+"""
+import argparse
+import os
+
+# The storm comes from one address; keep the login rate limits out of the
+# way unless asked to measure them
+os.environ.setdefault("LOGIN_RATE_LIMIT_PER_IP", "0")
+os.environ.setdefault("LOGIN_RATE_LIMIT_PER_USERNAME", "0")
+
+import asyncio
+import time
+
+from benchmarks.common import seed_user, client_for, summarize
+
+from main import app
+from models.UserModels import User
+from Services.db_config import setup_async_db
+from Services.passwords import password_hasher, pwd_context, BCRYPT_ROUNDS
+
+PASSWORD = "storm-password"
+
+async def seed_storm_users(count: int) -> list:
+    # One hash shared by every user keeps seeding fast
+    hashed = pwd_context.hash(PASSWORD)
+    _, Session = setup_async_db()
+    async with Session() as db:
+        for i in range(count):
+            db.add(User(Name=f"Storm {i}", Username=f"storm{i}", Email=f"storm{i}@example.com", Password=hashed))
+        await db.commit()
+    return [f"storm{i}" for i in range(count)]
+
+async def probe(client, stop: asyncio.Event, interval: float) -> list:
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/sessions/user_sessions")
+        response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return samples
+
+async def storm(usernames: list, total: int, concurrency: int) -> dict:
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(usernames[i % len(usernames)])
+    outcomes = {}
+
+    async def worker():
+        async with client_for(app) as client:
+            while not queue.empty():
+                username = queue.get_nowait()
+                response = await client.post("/login", data={"username": username, "password": PASSWORD})
+                outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+                client.cookies.clear()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"seconds": time.perf_counter() - start, "outcomes": outcomes}
+
+async def phase(label: str, token: str, usernames: list, args):
+    async with client_for(app, token) as client:
+        stop = asyncio.Event()
+        probing = asyncio.create_task(probe(client, stop, args.interval))
+        result = await storm(usernames, args.logins, args.concurrency) if args.logins else None
+        if result is None:
+            await asyncio.sleep(1)
+        stop.set()
+        samples = await probing
+
+    stats = summarize(samples)
+    line = f"{label:<14} probe p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms"
+    if result:
+        line += f"  logins {args.logins / result['seconds']:.1f}/s {result['outcomes']}"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    async def scenario():
+        _, token = await seed_user()
+        usernames = await seed_storm_users(args.users)
+        print(f"bcrypt rounds={BCRYPT_ROUNDS}, pool workers={password_hasher.workers}")
+
+        logins = args.logins
+        args.logins = 0
+        await phase("idle", token, usernames, args)
+        args.logins = logins
+
+        workers = password_hasher.workers
+        password_hasher.workers = 0
+        await phase("on event loop", token, usernames, args)
+        password_hasher.workers = workers
+        await phase("hashing pool", token, usernames, args)
+        print(f"passwords {password_hasher.stats()}")
+
+    asyncio.run(scenario())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Requests/sec on GET /sessions/user_sessions with the legacy per-request
+setup_db() dependency versus the process-wide pooled engine.
+
+    python -m benchmarks.bench_user_sessions --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import seed_user, client_for
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from main import app
+from Services.db_config import Base, setup_async_db, get_db
+from Services.session_management import create_session
+
+async def legacy_get_db():
+    # The dependency as it was before the pooled engine: new engine,
+    # session factory and create_all on every request
+    engine = create_async_engine(f'sqlite+aiosqlite:///{os.environ["DB_FILE_NAME"]}')
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        async with Session() as db:
+            yield db
+    finally:
+        await engine.dispose()
+
+async def seed(sessions_per_user: int):
+    user, token = await seed_user()
+    _, Session = setup_async_db()
+    async with Session() as db:
+        for i in range(sessions_per_user):
+            await create_session(user.id, f"session-{i}", db)
+    return token
+
+async def run(label: str, token: str, total: int, concurrency: int):
+    async with client_for(app, token) as client:
+        queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                response = await client.get("/sessions/user_sessions")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    print(f"{label:<8} {total} requests in {elapsed:.2f}s -> {total / elapsed:.1f} req/s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=25)
+    args = parser.parse_args()
+
+    async def scenario():
+        token = await seed(args.sessions)
+        app.dependency_overrides[get_db] = legacy_get_db
+        await run("before", token, args.requests, args.concurrency)
+        app.dependency_overrides.clear()
+        await run("after", token, args.requests, args.concurrency)
+
+    asyncio.run(scenario())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import resource
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Benchmarks never touch the real database file or document storage
+BENCH_DIR = tempfile.mkdtemp(prefix="bench-")
+os.environ["DB_FILE_NAME"] = os.path.join(BENCH_DIR, "bench.sqlite3")
+os.environ.setdefault("DOCUMENTS_DIR", os.path.join(BENCH_DIR, "uploads"))
+os.environ.setdefault("DOCUMENT_STORE_DIR", os.path.join(BENCH_DIR, "documents"))
+os.environ.setdefault("VECTOR_STORE_DIR", os.path.join(BENCH_DIR, "agents"))
+os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(BENCH_DIR, "embeddings.sqlite3"))
+
+import logging
+import httpx
+
+from Services.db_config import init_db, setup_async_db
+from Services.auth import create_access_token, create_user
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("Agents.agents").setLevel(logging.WARNING)
+
+async def seed_user(username: str = "bench", password: str = "bench", isadmin: bool = False):
+    await init_db()
+    _, Session = setup_async_db()
+    async with Session() as db:
+        user = await create_user({
+            "Name": username.title(), "Username": username, "Email": f"{username}@example.com",
+            "Password": password, "isadmin": isadmin, "isactive": True,
+        }, db)
+    return user, create_access_token({"sub": username})
+
+def client_for(app, token: str = None) -> httpx.AsyncClient:
+    cookies = {"access_token": f"Bearer {token}"} if token else None
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", cookies=cookies, timeout=None)
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(samples: list) -> dict:
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+def rss_bytes() -> int:
+    # Current resident set size; falls back to the peak where /proc is missing
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
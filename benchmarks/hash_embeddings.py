@@ -0,0 +1,23 @@
+"""Deterministic stand-in for the sentence-transformers model, shared by the
+benchmarks and the test suite. Kept free of the environment setup in
+benchmarks/common.py so tests can import it."""
+import hashlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+class HashEmbeddings(Embeddings):
+    # Bag-of-words vectors: each word hashes to one dimension, so texts that
+    # share words get similar vectors
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+
+    def embed_query(self, text: str) -> list:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        return [self.embed_query(text) for text in texts]
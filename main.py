@@ -1,19 +1,37 @@
 from fastapi import FastAPI, Request, Depends, HTTPException, status, Form, staticfiles
-from sqlalchemy.orm import Session as SessionDB
+from sqlalchemy.ext.asyncio import AsyncSession as SessionDB
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from datetime import timedelta
+from typing import Optional
 from Services.auth import authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, get_current_user, get_optional_user
-from Services.db_config import setup_db, get_db
+from Services.db_config import init_db, dispose_db, get_db
 from models.UserModels import User
 from Users import user
 from Sessions import sessions
 from Agents import agents
 from Services.session_management import get_active_sessions, get_session_by_id
+from Services.pagination import InvalidCursor, PAGE_SIZE
+from Services.inference import inference_scheduler
+from Services.agent_management import chains_cache
+from Services.embeddings import embedding_service
+from Services.embedding_cache import embedding_cache
+from Services.response_cache import response_cache
+from Services.conversation_memory import conversation_store
+from Services.chat_log import chat_log
+from Services.rag_engine import rag_engine
+from Services.llm_providers import llm_stats, close_http_clients
+from Services.user_cache import user_cache
+from Services.passwords import password_hasher
+from Services.rate_limit import login_ip_limiter, login_username_limiter
+from Services.warmup import start_warmup, stop_warmup, warmup_state, is_ready
+from Services.ingestion import resume_jobs, shutdown_ingestion
+from Services.DocManagement import UploadSizeLimit
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 
 # Set up CORS
 origins = [
@@ -24,13 +42,30 @@ origins = [
 
 load_dotenv()
 
-engine, Session = setup_db()
-
 app = FastAPI(title="Multi Agent API Services", description="This is a multi agent api services")
 app.include_router(user.user_routes)
 app.include_router(sessions.session_routes)
 app.include_router(agents.agent_routes)
 
+@app.on_event("startup")
+async def on_startup():
+    await init_db()
+    await resume_jobs()
+    start_warmup()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_warmup()
+    inference_scheduler.shutdown()
+    shutdown_ingestion()
+    embedding_cache.close()
+    conversation_store.shutdown()
+    password_hasher.shutdown()
+    await chat_log.close()
+    await close_http_clients()
+    await dispose_db()
+
+app.add_middleware(UploadSizeLimit)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -67,9 +102,37 @@ async def contact_page(request: Request, current_user: User = Depends(get_option
     return templates.TemplateResponse("contact.html", {"request": request, "current_user": current_user})
 
 @app.get("/playground", response_class=HTMLResponse, name="playground_page")
-async def playground_page(request: Request, current_user: User = Depends(get_current_user), db: SessionDB = Depends(get_db)):
-    sessions = get_active_sessions(current_user.id, db)
-    return templates.TemplateResponse("playground.html", {"request": request, "current_user": current_user, "sessions": sessions})
+async def playground_page(request: Request, cursor: Optional[str] = None, current_user: User = Depends(get_current_user), db: SessionDB = Depends(get_db)):
+    try:
+        sessions, next_cursor = await get_active_sessions(current_user.id, db, PAGE_SIZE, cursor)
+    except InvalidCursor:
+        return RedirectResponse(url="/playground", status_code=status.HTTP_302_FOUND)
+    return templates.TemplateResponse("playground.html", {"request": request, "current_user": current_user, "sessions": sessions, "next_cursor": next_cursor})
+
+@app.get("/metrics")
+async def metrics(current_user: User = Depends(get_current_user)):
+    # Carries agent ids and cache internals, so admins only, like /admin/chains
+    if not current_user.isadmin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to view metrics")
+    return {
+        "inference": inference_scheduler.snapshot(),
+        "chain_cache": chains_cache.stats(),
+        "embeddings": embedding_service.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "conversations": conversation_store.stats(),
+        "chat_log": chat_log.stats(),
+        "rag_engine": rag_engine.stats(),
+        "llm": llm_stats(),
+        "user_cache": user_cache.stats(),
+        "passwords": password_hasher.stats(),
+        "login_rate_limit": {"ip": login_ip_limiter.stats(), "username": login_username_limiter.stats()},
+    }
+
+@app.get("/health/ready")
+async def readiness():
+    status_code = status.HTTP_200_OK if is_ready() else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=status_code, content=jsonable_encoder(warmup_state))
 
 @app.get("/logout", response_class=HTMLResponse, name="logout")
 async def logout(request: Request):
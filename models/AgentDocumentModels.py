@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, UniqueConstraint
+from Services.db_config import Base
+from datetime import datetime
+import uuid
+
+class AgentDocument(Base):
+    __tablename__ = "agent_documents"
+    __table_args__ = (UniqueConstraint("agent_id", "file_hash", name="uq_agent_documents_agent_file"),)
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
+    agent_id = Column(String, ForeignKey("agents.id"), nullable=False, index=True)
+    file_hash = Column(String, nullable=False)
+    path = Column(Text, nullable=False)
+    filename = Column(String, nullable=True)
+    # pending -> ready, removing -> (deleted), or failed
+    status = Column(String, nullable=False, default="pending")
+    chunks = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from Services.db_config import Base
 from datetime import datetime
@@ -6,6 +6,8 @@ import uuid
 
 class Agent(Base):
     __tablename__ = "agents"
+    # Serves the newest-first agent list of a session (Services/pagination.py)
+    __table_args__ = (Index("ix_agents_session_created", "session_id", "created_at", "id"),)
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
     name = Column(String, nullable=False)
@@ -15,6 +17,8 @@ class Agent(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     document_paths = Column(Text, nullable=True)
     prompt_template = Column(Text, nullable=True)
+    # flat / hnsw / ivfpq, or NULL to pick by corpus size (Services/ann_index.py)
+    index_type = Column(String, nullable=True)
 
     session = relationship("Session", back_populates="agent")
     user = relationship("User", back_populates="agents")
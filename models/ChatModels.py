@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from Services.db_config import Base
 from datetime import datetime
@@ -6,9 +6,12 @@ import uuid
 
 class Chat(Base):
     __tablename__ = "chats"
+    # History and conversation memory read one (agent, user) newest first;
+    # id breaks ties between equal timestamps for keyset pagination
+    __table_args__ = (Index("ix_chats_agent_user_created", "agent_id", "user_id", "created_at", "id"),)
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
-    session_id = Column(String, ForeignKey("sessions.id"), nullable=False)
+    session_id = Column(String, ForeignKey("sessions.id"), nullable=False, index=True)
     agent_id = Column(String, ForeignKey("agents.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     message = Column(Text, nullable=False)
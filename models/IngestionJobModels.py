@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean
+from Services.db_config import Base
+from datetime import datetime
+import uuid
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
+    agent_id = Column(String, ForeignKey("agents.id"), nullable=False, index=True)
+    session_id = Column(String, ForeignKey("sessions.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, nullable=False, default="queued", index=True)
+    progress = Column(Integer, nullable=False, default=0)
+    document_paths = Column(Text, nullable=True)
+    instructions = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    # JSON document/chunk reuse counts from the document registry
+    stats = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from Services.db_config import Base
 from datetime import datetime
@@ -6,6 +6,8 @@ import uuid
 
 class Session(Base):
     __tablename__ = "sessions"
+    # Serves the newest-first session list (Services/pagination.py)
+    __table_args__ = (Index("ix_sessions_user_created", "user_id", "created_at", "id"),)
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
     name = Column(String, nullable=False)
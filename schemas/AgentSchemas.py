@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, field_validator
+from typing import Optional, List, Literal
 from datetime import datetime
+import json
 
 class AgentBase(BaseModel):
     name: str
@@ -10,7 +11,7 @@ class AgentCreate(AgentBase):
     user_id: int
 
 class AgentUpdate(AgentBase):
-    pass
+    index_type: Optional[Literal["auto", "flat", "hnsw", "ivfpq"]] = None
 
 class AgentResponse(AgentBase):
     id: str
@@ -20,8 +21,29 @@ class AgentResponse(AgentBase):
     updated_at: datetime
     document_paths: Optional[List[str]] = None
     prompt_template: Optional[str] = None
+    index_type: Optional[str] = None
+
+    @field_validator("document_paths", mode="before")
+    @classmethod
+    def parse_document_paths(cls, value):
+        # Stored as a JSON list on the model
+        return json.loads(value) if isinstance(value, str) else value
 
     class Config:
         orm_mode = True
 
+class AgentDocumentResponse(BaseModel):
+    id: str
+    agent_id: str
+    file_hash: str
+    filename: Optional[str] = None
+    status: str
+    chunks: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
 # Remove the AgentPrepare class
\ No newline at end of file
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import List, Optional
 
 class ChatBase(BaseModel):
     message: str
@@ -17,4 +18,9 @@ class ChatResponse(BaseModel):
     created_at: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class ChatHistoryResponse(BaseModel):
+    items: List[ChatResponse]
+    # Pass back as ?cursor= for the next (older) page; null on the last page
+    next_cursor: Optional[str] = None
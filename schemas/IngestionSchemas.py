@@ -0,0 +1,26 @@
+from pydantic import BaseModel, field_validator
+from datetime import datetime
+from typing import Optional
+import json
+
+class IngestionJobResponse(BaseModel):
+    id: str
+    agent_id: str
+    session_id: str
+    status: str
+    progress: int
+    error: Optional[str] = None
+    stats: Optional[dict] = None
+    cancel_requested: bool = False
+    created_at: datetime
+    updated_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @field_validator("stats", mode="before")
+    @classmethod
+    def parse_stats(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,85 @@
+import os
+import tempfile
+
+# Tests never touch the real database file, document storage or LLM, and
+# must be configured before the services read their settings at import
+TEST_DIR = tempfile.mkdtemp(prefix="tests-")
+os.environ["DB_FILE_NAME"] = os.path.join(TEST_DIR, "test.sqlite3")
+os.environ["DOCUMENTS_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ["DOCUMENT_STORE_DIR"] = os.path.join(TEST_DIR, "documents")
+os.environ["VECTOR_STORE_DIR"] = os.path.join(TEST_DIR, "agents")
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(TEST_DIR, "embeddings.sqlite3")
+os.environ["LOADER_PROCESSES"] = "0"
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["FAKE_LLM_LATENCY_MS"] = "0"
+os.environ["FAKE_LLM_TOKEN_MS"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+import itertools
+
+import httpx
+import numpy as np
+import pytest
+
+import models.UserModels, models.SessionModels, models.AgentsModels, models.ChatModels  # noqa: F401
+from benchmarks.hash_embeddings import HashEmbeddings
+from Services.db_config import init_db, dispose_db, setup_async_db
+from Services.auth import create_access_token, create_user
+from Services.embeddings import embedding_service
+from Services.user_cache import user_cache
+
+_database_ids = itertools.count()
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def database(monkeypatch):
+    # A fresh database file per test; the engines are rebuilt on first use
+    monkeypatch.setenv("DB_FILE_NAME", os.path.join(TEST_DIR, f"test-{next(_database_ids)}.sqlite3"))
+    await dispose_db()
+    await init_db()
+    _, Session = setup_async_db()
+    yield Session
+    user_cache.clear()
+    await dispose_db()
+
+@pytest.fixture
+async def db(database):
+    async with database() as session:
+        yield session
+
+@pytest.fixture
+async def user(db):
+    # (user, access token)
+    created = await create_user({
+        "Name": "Test", "Username": "test", "Email": "test@example.com",
+        "Password": "test-password", "isadmin": False, "isactive": True,
+    }, db)
+    return created, create_access_token({"sub": created.Username})
+
+@pytest.fixture
+async def client(user):
+    from main import app
+    _, token = user
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://test",
+        cookies={"access_token": f"Bearer {token}"},
+    ) as http:
+        yield http
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    monkeypatch.setattr(embedding_service, "_model", HashEmbeddings())
+    return embedding_service
+
+@pytest.fixture
+def write_doc(tmp_path):
+    def write(name: str, words: int = 400, seed: int = 0) -> str:
+        rng = np.random.default_rng(seed)
+        path = tmp_path / name
+        path.write_text(" ".join(f"w{n}" for n in rng.integers(0, 500, words)))
+        return str(path)
+    return write
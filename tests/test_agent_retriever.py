@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import select
+
+from models.IngestionJobModels import IngestionJob
+from Services import ingestion
+from Services.document_set import add_document
+from tests.test_ingestion import create_agent
+
+pytestmark = pytest.mark.anyio
+
+async def test_missing_index_queues_a_job_instead_of_building(db, user, client, write_doc, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(ingestion, "submit_job", submitted.append)
+    agent = await create_agent(db, user[0])
+    await add_document(agent.id, write_doc("doc.txt"), "doc.txt", db)
+
+    path = f"/sessions/{agent.session_id}/agents/{agent.id}/chat"
+    first = await client.post(path, json={"message": "hello"})
+    assert first.status_code == 503
+    assert first.headers["retry-after"] == "5"
+    job_id = first.json()["detail"]["job_id"]
+    assert submitted == [job_id]
+
+    # While that job is pending, further requests point at the same job
+    second = await client.post(f"{path}/stream", json={"message": "hello"})
+    assert second.status_code == 503 and second.json()["detail"]["job_id"] == job_id
+    jobs = (await db.execute(select(IngestionJob).where(IngestionJob.agent_id == agent.id))).scalars().all()
+    assert [job.id for job in jobs] == [job_id]
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from models.AgentsModels import Agent
+from models.ChatModels import Chat
+from Services.chat_log import ChatLog
+from Services.session_management import create_session
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def conversation(db, user):
+    session = await create_session(user[0].id, "chat", db)
+    agent = Agent(name="agent", session_id=session.id, user_id=user[0].id)
+    db.add(agent)
+    await db.commit()
+    return session.id, agent.id, user[0].id
+
+def turn(conversation, i: int) -> Chat:
+    session_id, agent_id, user_id = conversation
+    return Chat(session_id=session_id, agent_id=agent_id, user_id=user_id, message=f"q{i}", response=f"a{i}")
+
+async def stored(database) -> int:
+    async with database() as db:
+        return (await db.execute(select(func.count(Chat.id)))).scalar()
+
+async def test_flush_writes_queued_turns_in_batches(database, conversation):
+    log = ChatLog("batched", batch_size=10, flush_interval=1000, max_pending=100, put_timeout=1)
+    chats = [await log.record(turn(conversation, i)) for i in range(25)]
+    # Answered before anything is written, with the key already set
+    assert all(chat.id and chat.created_at for chat in chats)
+    await log.flush()
+    assert await stored(database) == 25
+    assert log.stats()["written"] == 25 and log.batches == 3
+    await log.close()
+
+async def test_flush_does_not_wait_for_turns_recorded_after_it(database, conversation):
+    log = ChatLog("batched", batch_size=5, flush_interval=10, max_pending=1000, put_timeout=1)
+    write_batch = log._write_batch
+
+    async def slow(batch):
+        await asyncio.sleep(0.02)
+        await write_batch(batch)
+
+    log._write_batch = slow
+    for i in range(5):
+        await log.record(turn(conversation, i))
+    stop = asyncio.Event()
+
+    async def producer():
+        # Another conversation keeps chatting while the reader waits
+        i = 5
+        while not stop.is_set():
+            await log.record(turn(conversation, i))
+            i += 1
+            await asyncio.sleep(0.001)
+
+    chatting = asyncio.ensure_future(producer())
+    try:
+        await asyncio.wait_for(log.flush(), 2)
+        assert await stored(database) >= 5
+    finally:
+        stop.set()
+        await chatting
+    await log.close()
+    assert await stored(database) == log.recorded
+
+async def test_full_queue_rejects_with_503(database, conversation):
+    log = ChatLog("batched", batch_size=1, flush_interval=1000, max_pending=2, put_timeout=0.05)
+    # Writes stall until the gate opens, so the queue fills up
+    gate = asyncio.Event()
+    write_batch = log._write_batch
+
+    async def stalled(batch):
+        await gate.wait()
+        await write_batch(batch)
+
+    log._write_batch = stalled
+    accepted = 0
+    with pytest.raises(HTTPException) as rejected:
+        for i in range(10):
+            await log.record(turn(conversation, i))
+            accepted += 1
+    assert rejected.value.status_code == 503 and rejected.value.headers["Retry-After"] == "1"
+    assert log.stats()["rejected"] == 1 and accepted <= 3
+
+    # Everything accepted is still written once the writer catches up
+    gate.set()
+    await log.close()
+    assert await stored(database) == accepted
+
+async def test_close_drains_pending_turns(database, conversation):
+    # A flush does not wait out a long interval for a batch to fill
+    log = ChatLog("batched", batch_size=100, flush_interval=60_000, max_pending=100, put_timeout=1)
+    for i in range(5):
+        await log.record(turn(conversation, i))
+    await log.close(timeout=5)
+    assert await stored(database) == 5
+    assert log.stats()["pending"] == 0
+
+async def test_bad_row_does_not_lose_the_batch(database, conversation):
+    log = ChatLog("batched", batch_size=10, flush_interval=1000, max_pending=100, put_timeout=1)
+    await log.record(turn(conversation, 0))
+    bad = turn(conversation, 1)
+    bad.message = None
+    await log.record(bad)
+    await log.record(turn(conversation, 2))
+    await log.flush()
+    assert await stored(database) == 2
+    assert (log.written, log.failed) == (2, 1)
+    await log.close()
+
+async def test_sync_mode_commits_before_returning(database, conversation):
+    log = ChatLog("sync", batch_size=10, flush_interval=1000, max_pending=1, put_timeout=1)
+    await log.record(turn(conversation, 0))
+    assert await stored(database) == 1
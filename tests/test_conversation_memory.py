@@ -0,0 +1,29 @@
+import pytest
+
+from models.AgentsModels import Agent
+from models.ChatModels import Chat
+from Services.chat_log import chat_log
+from Services.conversation_memory import ConversationStore
+from Services.session_management import create_session
+
+pytestmark = pytest.mark.anyio
+
+async def test_turn_loaded_while_being_recorded_is_not_appended_twice(db, user):
+    session = await create_session(user[0].id, "chat", db)
+    agent = Agent(name="agent", session_id=session.id, user_id=user[0].id)
+    db.add(agent)
+    await db.commit()
+    store = ConversationStore(max_tokens=1000, load_turns=20, max_conversations=10, idle_ttl=60)
+    key = (agent.id, user[0].id, session.id)
+
+    # The turn's own request records it; a concurrent request for the same
+    # conversation cold-loads it from the table before the append
+    chat = await chat_log.record(Chat(session_id=session.id, agent_id=agent.id, user_id=user[0].id, message="q1", response="a1"))
+    conversation = await store.get(*key, db)
+    assert list(conversation.turns) == [("q1", "a1")]
+    store.append(*key, "q1", "a1", chat.id)
+    assert list(conversation.turns) == [("q1", "a1")]
+
+    store.append(*key, "q2", "a2", "another-chat")
+    assert list(conversation.turns) == [("q1", "a1"), ("q2", "a2")]
+    await chat_log.close()
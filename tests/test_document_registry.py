@@ -0,0 +1,65 @@
+import pickle
+
+import numpy as np
+import pytest
+from langchain_core.documents.base import Document
+
+from Services import document_registry
+from benchmarks.hash_embeddings import HashEmbeddings
+
+SPLITTER = "test:10"
+
+def batches_of(chunks: list, size: int):
+    for start in range(0, len(chunks), size):
+        yield chunks[start:start + size]
+
+@pytest.fixture
+def chunks():
+    return [Document(page_content=f"chunk {i} text", metadata={"page": i}) for i in range(10)]
+
+def test_builds_batch_by_batch_then_reuses(chunks):
+    embedder = HashEmbeddings()
+    embedded_batches = []
+
+    def embed(texts):
+        embedded_batches.append(len(texts))
+        return embedder.embed_documents(texts)
+
+    stats = document_registry.new_stats(1)
+    built, vectors = document_registry.get_or_build(
+        "doc-a", "a.txt", SPLITTER, "hash", stream_chunks=lambda _: batches_of(chunks, 4), embed=embed, stats=stats
+    )
+    assert embedded_batches == [4, 4, 2]
+    assert [chunk.page_content for chunk in built] == [chunk.page_content for chunk in chunks]
+    assert isinstance(vectors, np.memmap) and vectors.shape == (10, embedder.dim)
+    np.testing.assert_allclose(vectors[3], embedder.embed_query("chunk 3 text"))
+
+    def fail(_):
+        raise AssertionError("a stored document must not be parsed again")
+
+    stats = document_registry.new_stats(1)
+    reused, _ = document_registry.get_or_build("doc-a", "a.txt", SPLITTER, "hash", stream_chunks=fail, embed=fail, stats=stats)
+    assert len(reused) == 10 and stats["documents_reused"] == 1 and stats["chunks_embedded"] == 0
+
+def test_new_model_reembeds_stored_chunks(chunks):
+    embedder = HashEmbeddings()
+    stats = document_registry.new_stats(1)
+    document_registry.get_or_build(
+        "doc-b", "b.txt", SPLITTER, "hash", stream_chunks=lambda _: batches_of(chunks, 4),
+        embed=embedder.embed_documents, stats=stats,
+    )
+    stats = document_registry.new_stats(1)
+    _, vectors = document_registry.get_or_build(
+        "doc-b", "b.txt", SPLITTER, "other-model", stream_chunks=None, embed=HashEmbeddings(8).embed_documents, stats=stats,
+    )
+    assert vectors.shape == (10, 8) and stats["chunks_embedded"] == 10
+
+def test_reads_single_list_chunk_files(chunks):
+    # Entries written before chunks were stored per batch
+    document_registry.get_or_build(
+        "doc-c", "c.txt", SPLITTER, "hash", stream_chunks=lambda _: batches_of(chunks, 4),
+        embed=HashEmbeddings().embed_documents, stats=document_registry.new_stats(1),
+    )
+    with open(f"{document_registry.document_dir('doc-c')}/chunks.pkl", "wb") as f:
+        pickle.dump(chunks, f)
+    assert len(document_registry.load_chunks("doc-c", SPLITTER)) == 10
@@ -0,0 +1,43 @@
+from Services.agent_management import build_vectordb, indexed_documents
+from Services.vector_store import file_hash
+
+def documents_in(vectordb) -> set:
+    return set(indexed_documents(vectordb))
+
+def test_adding_and_removing_documents_updates_index_in_place(embeddings, write_doc):
+    first, second, third = (write_doc(f"doc{i}.txt", seed=i) for i in range(3))
+    stats = {}
+    build_vectordb("agent-update", [first, second], embeddings, stats=stats)
+    assert stats["mode"] == "full"
+    chunks = dict(stats["document_chunks"])
+
+    stats = {}
+    vectordb = build_vectordb("agent-update", [first, third], embeddings, stats=stats)
+    assert stats["mode"] == "incremental"
+    assert (stats["documents_added"], stats["documents_removed"]) == (1, 1)
+    # The kept document comes from the index, not the registry
+    assert stats["chunks_embedded"] == stats["document_chunks"][file_hash(third)]
+    assert documents_in(vectordb) == {file_hash(first), file_hash(third)}
+    assert vectordb.index.ntotal == chunks[file_hash(first)] + stats["document_chunks"][file_hash(third)]
+    assert len(vectordb.docstore._dict) == vectordb.index.ntotal
+
+def test_unchanged_documents_reuse_saved_index(embeddings, write_doc):
+    docs = [write_doc("same.txt")]
+    build_vectordb("agent-same", docs, embeddings)
+    stats = {}
+    build_vectordb("agent-same", docs, embeddings, stats=stats)
+    assert stats["index_reused"] is True
+
+def test_removal_from_hnsw_rebuilds(embeddings, write_doc):
+    first, second = write_doc("a.txt", seed=1), write_doc("b.txt", seed=2)
+    build_vectordb("agent-hnsw", [first, second], embeddings, index_type="hnsw")
+
+    stats = {}
+    build_vectordb("agent-hnsw", [first, second, write_doc("c.txt", seed=3)], embeddings, stats=stats, index_type="hnsw")
+    assert stats["mode"] == "incremental"
+
+    stats = {}
+    vectordb = build_vectordb("agent-hnsw", [first], embeddings, stats=stats, index_type="hnsw")
+    assert stats["mode"] == "rebuild"
+    assert documents_in(vectordb) == {file_hash(first)}
+    assert vectordb.index.ntotal == stats["document_chunks"][file_hash(first)]
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from Services.inference import InferenceScheduler
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def scheduler():
+    scheduler = InferenceScheduler(workers=2, per_agent_limit=1, max_queue=2, timeout=5)
+    yield scheduler
+    scheduler.shutdown()
+
+@pytest.fixture
+def gate():
+    # Blocks worker threads until set; always set on teardown so a failing
+    # test cannot leave a thread waiting forever
+    gate = threading.Event()
+    yield gate
+    gate.set()
+
+async def wait_until(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+async def test_timed_out_call_keeps_its_admission_until_the_thread_finishes(scheduler, gate):
+    with pytest.raises(HTTPException) as timed_out:
+        await scheduler.run("agent", gate.wait, timeout=0.05)
+    assert timed_out.value.status_code == 504
+    assert scheduler.pending == 1 and scheduler.running == 1
+
+    gate.set()
+    await wait_until(lambda: scheduler.running == 0)
+    assert scheduler.pending == 0
+
+async def test_queue_stays_full_while_abandoned_calls_run(scheduler, gate):
+    for agent_id in ("a", "b"):
+        with pytest.raises(HTTPException):
+            await scheduler.run(agent_id, gate.wait, timeout=0.05)
+
+    with pytest.raises(HTTPException) as rejected:
+        await scheduler.run("c", lambda: "answer")
+    assert rejected.value.status_code == 429
+
+    gate.set()
+    await wait_until(lambda: scheduler.pending == 0)
+    assert await scheduler.run("c", lambda: "answer") == "answer"
+
+async def test_call_timed_out_while_queued_frees_its_admission(scheduler, gate):
+    running = asyncio.ensure_future(scheduler.run("agent", gate.wait))
+    await wait_until(lambda: scheduler.running == 1)
+
+    with pytest.raises(HTTPException):
+        await scheduler.run("agent", lambda: "never", timeout=0.05)
+    assert scheduler.pending == 1 and scheduler.waiting == 0
+
+    gate.set()
+    assert await running is True
+    assert scheduler.pending == 0
+
+async def test_idle_agents_are_evicted(scheduler, gate):
+    for i in range(20):
+        await scheduler.run(f"agent-{i}", lambda: None)
+    assert scheduler._agent_slots == {}
+
+    running = asyncio.ensure_future(scheduler.run("busy", gate.wait))
+    await wait_until(lambda: scheduler.running == 1)
+    assert list(scheduler._agent_slots) == ["busy"]
+    gate.set()
+    await running
+    assert scheduler._agent_slots == {}
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from models.AgentsModels import Agent
+from models.IngestionJobModels import IngestionJob
+from Services import agent_management, ingestion
+from Services.agent_management import build_vectordb, chains_cache
+from Services.db_config import setup_db
+from Services.vector_store import current_index_hash, has_index
+
+pytestmark = pytest.mark.anyio
+
+class Cancelled(Exception):
+    pass
+
+async def create_agent(db, user, docs=None) -> Agent:
+    agent = Agent(name="agent", session_id="session", user_id=user.id, document_paths=json.dumps(docs) if docs else None)
+    db.add(agent)
+    await db.commit()
+    return agent
+
+def cancel_when_indexing(monkeypatch, on_index):
+    # Runs on_index as the index is assembled, i.e. just before it is saved
+    create_vectorstore = agent_management.create_vectorstore
+
+    def create_then_cancel(*args, **kwargs):
+        vectordb = create_vectorstore(*args, **kwargs)
+        on_index()
+        return vectordb
+
+    monkeypatch.setattr(agent_management, "create_vectorstore", create_then_cancel)
+
+async def test_cancel_before_save_keeps_current_index(embeddings, write_doc):
+    first = write_doc("first.txt", seed=1)
+    build_vectordb("agent-keep", [first], embeddings)
+    live = current_index_hash("agent-keep")
+
+    def cancelled():
+        raise Cancelled()
+
+    with pytest.raises(Cancelled):
+        build_vectordb("agent-keep", [first, write_doc("second.txt", seed=2)], embeddings, check_cancelled=cancelled)
+    assert current_index_hash("agent-keep") == live
+
+async def test_job_cancelled_during_indexing_leaves_no_index(db, user, embeddings, write_doc, monkeypatch):
+    agent = await create_agent(db, user[0], [write_doc("doc.txt")])
+    job = IngestionJob(agent_id=agent.id, session_id="session", user_id=user[0].id, status="queued", progress=0)
+    db.add(job)
+    await db.commit()
+
+    def request_cancel():
+        _, Session = setup_db()
+        with Session() as sync_db:
+            sync_db.get(IngestionJob, job.id).cancel_requested = True
+            sync_db.commit()
+
+    cancel_when_indexing(monkeypatch, request_cancel)
+    ingestion.run_job(job.id)
+
+    await db.refresh(job)
+    assert job.status == "cancelled"
+    assert not has_index(agent.id)
+    assert agent.id not in chains_cache
+
+async def test_job_runs_to_ready(db, user, embeddings, write_doc):
+    agent = await create_agent(db, user[0], [write_doc("doc.txt")])
+    job = IngestionJob(agent_id=agent.id, session_id="session", user_id=user[0].id, status="queued", progress=0)
+    db.add(job)
+    await db.commit()
+
+    ingestion.run_job(job.id)
+
+    await db.refresh(job)
+    assert job.status == "ready"
+    assert has_index(agent.id)
+    chains_cache.pop(agent.id)
@@ -0,0 +1,22 @@
+import httpx
+import pytest
+
+from main import app
+from Services.auth import create_access_token, create_user
+
+pytestmark = pytest.mark.anyio
+
+async def test_metrics_requires_a_login():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as anonymous:
+        assert (await anonymous.get("/metrics")).status_code == 401
+
+async def test_metrics_is_admin_only(db, client):
+    assert (await client.get("/metrics")).status_code == 403
+
+    await create_user({
+        "Name": "Admin", "Username": "admin", "Email": "admin@example.com",
+        "Password": "admin-password", "isadmin": True, "isactive": True,
+    }, db)
+    client.cookies.set("access_token", f"Bearer {create_access_token({'sub': 'admin'})}")
+    response = await client.get("/metrics")
+    assert response.status_code == 200 and "chain_cache" in response.json()
@@ -0,0 +1,114 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models.AgentsModels import Agent
+from models.ChatModels import Chat
+from Services.auth import create_user
+from Services.db_config import setup_async_db
+from Services.pagination import InvalidCursor, decode_cursor, encode_cursor
+from Services.session_management import create_session
+
+pytestmark = pytest.mark.anyio
+
+SESSIONS = 23
+AGENTS = 17
+CHATS = 31
+LIMIT = 5
+
+@contextmanager
+def counting():
+    engine, _ = setup_async_db()
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+async def walk(client, path: str, items=lambda body: body, next_cursor=None, per_page: int = 1) -> list:
+    # Reads every page; each must cost exactly per_page statements, whatever
+    # the page number or how many rows the user has
+    next_cursor = next_cursor or (lambda response: response.headers.get("x-next-cursor"))
+    cursor, rows = None, []
+    while True:
+        with counting() as statements:
+            response = await client.get(path, params={"limit": LIMIT, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        assert len(statements) == per_page, statements
+        page = items(response.json())
+        assert len(page) <= LIMIT
+        rows.extend(page)
+        cursor = next_cursor(response)
+        if not cursor:
+            return rows
+
+@pytest.fixture
+async def crowded(db, user, client):
+    # Sessions for the test user, and another user's session holding many
+    # agents; the user cache is warmed so only the listings are counted
+    sessions = [await create_session(user[0].id, f"session-{i}", db) for i in range(SESSIONS)]
+    other = await create_user({
+        "Name": "Crowd", "Username": "crowd", "Email": "crowd@example.com",
+        "Password": "crowd-password", "isadmin": False, "isactive": True,
+    }, db)
+    session = await create_session(other.id, "crowded", db)
+    db.add_all(Agent(name=f"agent-{i}", session_id=session.id, user_id=other.id) for i in range(AGENTS))
+    await db.commit()
+    await client.get("/sessions/user_sessions", params={"limit": 1})
+    return sessions, session
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, "abc")) == (created_at, "abc")
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+async def test_session_listing_pages_through_every_session(crowded, client):
+    sessions, _ = crowded
+    rows = await walk(client, "/sessions/user_sessions")
+    assert [row["id"] for row in rows] == [session.id for session in sorted(
+        sessions, key=lambda session: (session.created_at, session.id), reverse=True
+    )]
+
+async def test_agent_listing_pages_through_every_agent(crowded, client):
+    _, session = crowded
+    rows = await walk(client, f"/sessions/{session.id}/agents")
+    assert len({row["id"] for row in rows}) == AGENTS
+
+async def test_chat_history_pages_through_equal_timestamps(db, user, client):
+    session = await create_session(user[0].id, "chatty", db)
+    agent = Agent(name="agent", session_id=session.id, user_id=user[0].id)
+    db.add(agent)
+    await db.commit()
+    # Pairs of turns share a timestamp, so the id has to break the tie
+    start = datetime(2024, 1, 1)
+    db.add_all(
+        Chat(session_id=session.id, agent_id=agent.id, user_id=user[0].id, message=f"q{i}", response=f"a{i}",
+             created_at=start + timedelta(seconds=i // 2))
+        for i in range(CHATS)
+    )
+    await db.commit()
+    await client.get("/sessions/user_sessions", params={"limit": 1})
+
+    rows = await walk(
+        client,
+        f"/sessions/{session.id}/agents/{agent.id}/chat/history",
+        items=lambda body: body["items"],
+        next_cursor=lambda response: response.json()["next_cursor"],
+        # The agent's ownership check, then the page
+        per_page=2,
+    )
+    assert sorted(row["message"] for row in rows) == sorted(f"q{i}" for i in range(CHATS))
+    keys = [(row["created_at"], row["id"]) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+
+async def test_bad_cursor_is_rejected(user, client):
+    response = await client.get("/sessions/user_sessions", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
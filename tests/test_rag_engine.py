@@ -0,0 +1,24 @@
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage
+
+from Services.rag_engine import rag_engine
+
+class PromptRecorder(BaseCallbackHandler):
+    def __init__(self):
+        self.prompts = []
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.prompts.extend("\n".join(str(message.content) for message in batch) for batch in messages)
+
+def test_agent_without_documents_sees_earlier_turns():
+    recorder = PromptRecorder()
+    history = [HumanMessage(content="My name is Ada."), AIMessage(content="Nice to meet you, Ada.")]
+    result = rag_engine.invoke(None, "What is my name?", history, config={"callbacks": [recorder]})
+    assert result["answer"]
+    assert "My name is Ada." in recorder.prompts[-1]
+    assert "Nice to meet you, Ada." in recorder.prompts[-1]
+
+def test_agent_without_documents_answers_a_first_question():
+    recorder = PromptRecorder()
+    rag_engine.invoke(None, "Hello?", [], config={"callbacks": [recorder]})
+    assert "Hello?" in recorder.prompts[-1]
@@ -0,0 +1,54 @@
+import pytest
+
+from Services import rate_limit
+from Services.rate_limit import RateLimiter
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+def test_limits_within_the_window(clock):
+    limiter = RateLimiter(limit=3, window=60, max_keys=100)
+    for _ in range(3):
+        assert limiter.retry_after("1.2.3.4") == 0
+        limiter.hit("1.2.3.4")
+        clock[0] += 1
+    assert limiter.retry_after("1.2.3.4") == 57
+    assert limiter.retry_after("5.6.7.8") == 0
+    assert limiter.stats()["limited"] == 1
+
+def test_window_slides(clock):
+    limiter = RateLimiter(limit=2, window=10, max_keys=100)
+    limiter.hit("key")
+    clock[0] += 5
+    limiter.hit("key")
+    assert limiter.retry_after("key") == 5
+    clock[0] += 5
+    # The first hit has left the window; the second has not
+    assert limiter.retry_after("key") == 0
+    limiter.hit("key")
+    assert limiter.retry_after("key") == 5
+
+def test_reset_clears_a_key(clock):
+    limiter = RateLimiter(limit=1, window=60, max_keys=100)
+    limiter.hit("alice")
+    assert limiter.retry_after("alice")
+    limiter.reset("alice")
+    assert limiter.retry_after("alice") == 0
+
+def test_keys_are_bounded(clock):
+    limiter = RateLimiter(limit=1, window=60, max_keys=3)
+    for i in range(10):
+        limiter.hit(f"10.0.0.{i}")
+    assert limiter.stats()["keys"] == 3
+    # The oldest keys were dropped, the newest still count
+    assert limiter.retry_after("10.0.0.0") == 0
+    assert limiter.retry_after("10.0.0.9") > 0
+
+def test_zero_limit_disables(clock):
+    limiter = RateLimiter(limit=0, window=60, max_keys=100)
+    for _ in range(100):
+        limiter.hit("key")
+    assert limiter.retry_after("key") == 0
@@ -0,0 +1,58 @@
+import pytest
+
+from Services.response_cache import ResponseCache, response_cache
+from benchmarks.hash_embeddings import HashEmbeddings
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def cache():
+    return ResponseCache(HashEmbeddings(), ttl=60, max_entries=10, similarity=0.95)
+
+def test_exact_and_semantic_hits(cache):
+    miss = cache.lookup("agent", "v1", "What is the refund policy")
+    assert miss.answer is None
+    cache.store("agent", "v1", "What is the refund policy", "30 days", miss.vector)
+
+    assert cache.lookup("agent", "v1", "what is the REFUND policy").match == "exact"
+    # Same words in another order: not the same key, but the same embedding
+    semantic = cache.lookup("agent", "v1", "the refund policy is what")
+    assert (semantic.match, semantic.answer) == ("semantic", "30 days")
+
+def test_new_version_and_invalidate_miss(cache):
+    cache.store("agent", "v1", "question", "answer")
+    assert cache.lookup("agent", "v2", "question").answer is None
+
+    cache.store("agent", "v2", "question", "answer")
+    cache.invalidate("agent")
+    assert cache.lookup("agent", "v2", "question").answer is None
+    assert cache.stats()["invalidations"] == 1
+
+def test_follow_ups_bypass_the_cache(cache):
+    history = ["earlier turn"]
+    cache.store("agent", "v1", "tell me more", "about refunds")
+    assert cache.lookup("agent", "v1", "tell me more", history).answer is None
+
+    cache.store("agent", "v1", "and then?", "something", chat_history=history)
+    assert cache.lookup("agent", "v1", "and then?").answer is None
+    assert cache.stats()["bypassed"] == 1
+
+async def test_follow_up_is_not_answered_from_another_conversation(client, user, monkeypatch):
+    # One agent, two sessions: the same "tell me more" follows different
+    # opening questions
+    monkeypatch.setattr(response_cache, "embedding", HashEmbeddings())
+    before = response_cache.stats()
+    session = (await client.post("/sessions/create", json={"name": "s"})).json()
+    agent = (await client.post(
+        f"/sessions/{session['id']}/agents", json={"name": "a", "session_id": session["id"], "user_id": user[0].id}
+    )).json()
+
+    for conversation, opening in (("first", "What are refunds?"), ("second", "What are shipping times?")):
+        for message in (opening, "tell me more"):
+            response = await client.post(f"/sessions/{conversation}/agents/{agent['id']}/chat", json={"message": message})
+            assert response.status_code == 200
+
+    after = response_cache.stats()
+    assert after["exact_hits"] == before["exact_hits"]
+    assert after["stores"] - before["stores"] == 2
+    assert after["bypassed"] - before["bypassed"] == 2
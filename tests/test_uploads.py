@@ -0,0 +1,56 @@
+import httpx
+import pytest
+from fastapi import FastAPI, File, UploadFile
+
+from Services.DocManagement import UploadSizeLimit
+
+pytestmark = pytest.mark.anyio
+
+LIMIT = 64 * 1024
+
+@pytest.fixture
+def received():
+    return []
+
+@pytest.fixture
+async def upload_client(received):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        received.append(file.filename)
+        return {"size": len(await file.read())}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=UploadSizeLimit(app, max_body=LIMIT)), base_url="http://test") as client:
+        yield client
+
+def multipart(size: int):
+    boundary = "test-boundary"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.txt\"\r\n"
+        f"Content-Type: text/plain\r\n\r\n"
+    ).encode() + b"x" * size + f"\r\n--{boundary}--\r\n".encode()
+    return body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+async def test_small_upload_passes(upload_client, received):
+    body, headers = multipart(1024)
+    response = await upload_client.post("/upload", content=body, headers=headers)
+    assert response.status_code == 200 and response.json() == {"size": 1024}
+    assert received == ["big.txt"]
+
+async def test_declared_length_over_limit_is_rejected_unread(upload_client, received):
+    body, headers = multipart(LIMIT * 2)
+    response = await upload_client.post("/upload", content=body, headers=headers)
+    assert response.status_code == 413
+    assert received == []
+
+async def test_streamed_body_over_limit_is_cut_off(upload_client, received):
+    body, headers = multipart(LIMIT * 4)
+
+    async def chunks():
+        for start in range(0, len(body), 16 * 1024):
+            yield body[start:start + 16 * 1024]
+
+    response = await upload_client.post("/upload", content=chunks(), headers=headers)
+    assert response.status_code == 413
+    assert received == []
@@ -0,0 +1,36 @@
+import pytest
+
+from Services import auth
+from Services.auth import authenticate_user, resolve_user, update_user
+from Services.user_cache import user_cache
+
+pytestmark = pytest.mark.anyio
+
+async def test_cached_user_carries_no_password_hash(db, user):
+    await resolve_user("test", db)
+    cached = await resolve_user("test", db)
+    assert user_cache.hits >= 1
+    assert cached.id == user[0].id and cached.Username == "test"
+    assert cached.Password is None
+    assert all("Password" not in values for _, values in user_cache._entries.values())
+
+async def test_deactivating_a_user_invalidates_the_entry(db, user):
+    assert (await resolve_user("test", db)).isactive is True
+    await update_user(user[0].id, {"isactive": False}, db)
+    assert "test" not in user_cache._entries
+    assert (await resolve_user("test", db)).isactive is False
+
+async def test_password_change_invalidates_the_entry(db, user):
+    await resolve_user("test", db)
+    await update_user(user[0].id, {"Password": await auth.get_password_hash("changed")}, db)
+    assert "test" not in user_cache._entries
+
+async def test_rehash_on_login_invalidates_the_entry(db, user, monkeypatch):
+    await resolve_user("test", db)
+
+    async def verify_and_rehash(password, hashed):
+        return True, await auth.get_password_hash(password)
+
+    monkeypatch.setattr(auth.password_hasher, "verify", verify_and_rehash)
+    assert await authenticate_user("test", "test-password", db)
+    assert "test" not in user_cache._entries
@@ -0,0 +1,34 @@
+import os
+
+from Services import vector_store
+from Services.agent_management import build_vectordb
+from Services.vector_store import agent_index_dir, current_index_hash, load_index, save_index
+
+def test_resaving_a_version_renames_the_live_one_aside(embeddings, write_doc, monkeypatch):
+    vectordb = build_vectordb("agent-swap", [write_doc("doc.txt")], embeddings)
+    digest = current_index_hash("agent-swap")
+    base_dir = agent_index_dir("agent-swap")
+    final_dir = os.path.join(base_dir, digest)
+
+    renames = []
+    replace, rmtree = os.replace, vector_store.shutil.rmtree
+
+    def recording_replace(src, dst):
+        renames.append((src, dst))
+        replace(src, dst)
+
+    def guarded_rmtree(path, *args, **kwargs):
+        # Deleting the live version in place leaves readers with no index
+        # for as long as the delete takes
+        assert os.path.abspath(path) != os.path.abspath(final_dir)
+        rmtree(path, *args, **kwargs)
+
+    monkeypatch.setattr(vector_store.os, "replace", recording_replace)
+    monkeypatch.setattr(vector_store.shutil, "rmtree", guarded_rmtree)
+    save_index("agent-swap", vectordb, digest)
+
+    (live, aside), (new, swapped_in) = renames[:2]
+    assert live == final_dir and os.path.basename(aside).startswith(".old-")
+    assert os.path.basename(new).startswith(".tmp-") and swapped_in == final_dir
+    assert sorted(os.listdir(base_dir)) == sorted([digest, vector_store.CURRENT_FILE])
+    assert load_index("agent-swap", embeddings).index.ntotal == vectordb.index.ntotal